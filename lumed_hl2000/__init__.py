@@ -0,0 +1,53 @@
+"""Control of the Ocean Optics HL-2000-HP-232R halogen light source.
+
+Public names are resolved lazily: ``from lumed_hl2000 import HL2000`` loads
+only the driver, not asyncio, the manager or any pyvisa backend. The Qt
+widget lives in :mod:`lumed_hl2000.widget` and is never imported from here.
+"""
+
+import importlib
+from typing import TYPE_CHECKING, Any, List
+
+from .errors import HL2000ClosedError, HL2000CommandError, HL2000Error, HL2000ProtocolError
+
+if TYPE_CHECKING:
+    from .aio import AsyncHL2000
+    from .driver import HL2000
+    from .manager import LampManager
+    from .state import DeviceState, StatePoller
+    from .worker import IOWorker
+
+_LAZY = {
+    "AsyncHL2000": ".aio",
+    "DeviceState": ".state",
+    "HL2000": ".driver",
+    "IOWorker": ".worker",
+    "LampManager": ".manager",
+    "StatePoller": ".state",
+}
+
+__all__ = [
+    "AsyncHL2000",
+    "DeviceState",
+    "HL2000",
+    "HL2000ClosedError",
+    "HL2000CommandError",
+    "HL2000Error",
+    "HL2000ProtocolError",
+    "IOWorker",
+    "LampManager",
+    "StatePoller",
+]
+
+
+def __getattr__(name: str) -> Any:
+    module = _LAZY.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module, __name__), name)
+    globals()[name] = value
+    return value
+
+
+def __dir__() -> List[str]:
+    return sorted(set(globals()) | set(__all__))
@@ -0,0 +1,102 @@
+"""asyncio front end for the HL-2000-HP-232R.
+
+Coroutines delegate to an :class:`~.worker.IOWorker` and await its futures,
+so serial round-trips never block the event loop and several instruments can
+be driven concurrently with :func:`asyncio.gather`.
+"""
+
+import asyncio
+from typing import Any, Dict
+
+from .driver import StatusSnapshot
+from .errors import HL2000ClosedError
+from .worker import IOWorker
+
+
+class AsyncHL2000:
+    """Awaitable driver for the lamp.
+
+    Args:
+        worker: Worker that owns the serial session. It is started by
+            :meth:`open` if it is not already running.
+        owns_worker: Stop the worker in :meth:`close`.
+    """
+
+    def __init__(self, worker: IOWorker, owns_worker: bool = True) -> None:
+        self._worker = worker
+        self._owns_worker = owns_worker
+
+    @classmethod
+    async def connect(cls, resource_name: str, **open_kwargs: Any) -> "AsyncHL2000":
+        """Open ``resource_name`` on a new worker and wait until it answers."""
+        lamp = cls(IOWorker.for_resource(resource_name, **open_kwargs))
+        await lamp.open()
+        return lamp
+
+    @property
+    def worker(self) -> IOWorker:
+        return self._worker
+
+    async def open(self) -> None:
+        """Start the worker and wait for the serial port to be opened.
+
+        Raises:
+            HL2000ClosedError: The worker was already stopped.
+        """
+        if not self._worker.running:
+            try:
+                self._worker.start()
+            except RuntimeError:  # threads can only be started once
+                raise HL2000ClosedError("worker is stopped") from None
+        await self._await(self._worker.call(lambda driver: None))
+
+    async def close(self) -> None:
+        """Stop the worker without blocking the event loop."""
+        if self._owns_worker:
+            await asyncio.get_running_loop().run_in_executor(None, self._worker.stop)
+
+    async def __aenter__(self) -> "AsyncHL2000":
+        await self.open()
+        return self
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    async def _await(self, future: Any) -> Any:
+        return await asyncio.wrap_future(future)
+
+    async def _call(self, method: str, *args: Any) -> Any:
+        return await self._await(self._worker.submit(method, *args))
+
+    async def set_shutter(self, is_open: bool) -> None:
+        await self._call("set_shutter", is_open)
+
+    async def open_shutter(self) -> None:
+        await self._call("open_shutter")
+
+    async def close_shutter(self) -> None:
+        await self._call("close_shutter")
+
+    async def is_shutter_open(self) -> bool:
+        return await self._call("is_shutter_open")
+
+    async def set_lamp(self, on: bool) -> None:
+        await self._call("set_lamp", on)
+
+    async def lamp_on(self) -> None:
+        await self._call("lamp_on")
+
+    async def lamp_off(self) -> None:
+        await self._call("lamp_off")
+
+    async def is_lamp_on(self) -> bool:
+        return await self._call("is_lamp_on")
+
+    async def status(self) -> Dict[str, bool]:
+        """Return ``{"shutter_open": ..., "lamp_on": ...}`` from one batched read."""
+        snapshot = await self.snapshot()
+        return {"shutter_open": snapshot.shutter_open, "lamp_on": snapshot.lamp_on}
+
+    async def snapshot(self) -> StatusSnapshot:
+        """Read every status field in one batched transaction."""
+        return await self._call("snapshot")
@@ -0,0 +1,286 @@
+"""Latency and throughput benchmark of the control path.
+
+Drives :class:`~.driver.HL2000` (directly and through the
+:class:`~.worker.IOWorker`) against the simulated lamp and reports per-command
+latency percentiles, commands per second and the shutter open→close round
+trip. If pyvisa-sim is installed, pyvisa's ``write()`` string path is timed
+against ``write_raw`` of a precompiled frame. It also measures startup in
+fresh interpreters: the import time of the package, the time to the first
+answered command, and whether pyvisa, asyncio or Qt were loaded along the way.
+Results are written to ``bench_output.txt``.
+
+Run with::
+
+    python -m lumed_hl2000.bench                       # report only
+    python -m lumed_hl2000.bench --save-baseline b.json
+    python -m lumed_hl2000.bench --baseline b.json     # exit 1 on regression
+    python -m lumed_hl2000.bench --replay production.hl2j
+
+With ``--no-realtime`` the simulator answers instantly, so the numbers measure
+the Python overhead of the control path without the serial transfer time.
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Callable, Dict, List, Sequence, Tuple
+
+from . import protocol
+from .driver import HL2000
+from .sim import SimulatedResourceManager
+from .timeouts import percentile
+from .worker import IOWorker
+
+RESOURCE_NAME = "ASRL1::INSTR"
+
+_STARTUP_SCRIPT = """
+import sys, time
+t0 = time.perf_counter()
+from lumed_hl2000 import HL2000
+t1 = time.perf_counter()
+from lumed_hl2000.sim import SimulatedResourceManager
+lamp = HL2000.open("ASRL1::INSTR", SimulatedResourceManager(realtime=False))
+lamp.is_lamp_on()
+t2 = time.perf_counter()
+heavy = [m for m in ("pyvisa", "asyncio", "PyQt5") if m in sys.modules]
+print(t1 - t0, t2 - t0, ",".join(heavy))
+"""
+
+# pyvisa-sim device answering the shutter query, for run_pyvisa_write().
+_PYVISA_SIM_DEVICE = f"""
+spec: "1.1"
+devices:
+  lamp:
+    eom:
+      ASRL INSTR:
+        q: "\\r"
+        r: "\\r"
+    dialogues:
+      - q: "{protocol.QUERY_SHUTTER}"
+        r: "0"
+resources:
+  {RESOURCE_NAME}:
+    device: lamp
+"""
+
+
+#: Metrics checked by :func:`compare`; the others are informational.
+GATED_METRICS = ("p50_ms", "p95_ms", "p99_ms", "ops_per_s")
+
+
+def _time_calls(fn: Callable[[int], object], iterations: int) -> List[float]:
+    samples = []
+    clock = time.perf_counter
+    for i in range(iterations):
+        start = clock()
+        fn(i)
+        samples.append(clock() - start)
+    return samples
+
+
+def _summarize(samples: Sequence[float]) -> Dict[str, float]:
+    total = sum(samples)
+    return {
+        "p50_ms": percentile(samples, 50) * 1e3,
+        "p95_ms": percentile(samples, 95) * 1e3,
+        "p99_ms": percentile(samples, 99) * 1e3,
+        "ops_per_s": len(samples) / total if total else float("inf"),
+    }
+
+
+def run(iterations: int = 200, realtime: bool = True, processing_delay: float = 0.002) -> Dict[str, Dict[str, float]]:
+    """Run every benchmark case and return ``{case: {metric: value}}``."""
+    manager = SimulatedResourceManager(
+        (RESOURCE_NAME,), realtime=realtime, processing_delay=processing_delay, seed=0
+    )
+    results: Dict[str, Dict[str, float]] = {}
+
+    lamp = HL2000.open(RESOURCE_NAME, manager)
+    try:
+        results["driver.set_shutter"] = _summarize(_time_calls(lambda i: lamp.set_shutter(i % 2 == 0), iterations))
+        results["driver.set_lamp"] = _summarize(_time_calls(lambda i: lamp.set_lamp(i % 2 == 0), iterations))
+        results["driver.is_shutter_open"] = _summarize(_time_calls(lambda i: lamp.is_shutter_open(), iterations))
+
+        def round_trip(i: int) -> None:
+            lamp.open_shutter()
+            lamp.close_shutter()
+
+        results["driver.shutter_round_trip"] = _summarize(_time_calls(round_trip, iterations))
+
+        def two_queries(i: int) -> None:
+            lamp.is_shutter_open()
+            lamp.is_lamp_on()
+
+        results["driver.status_two_queries"] = _summarize(_time_calls(two_queries, iterations))
+        results["driver.snapshot"] = _summarize(_time_calls(lambda i: lamp.snapshot(), iterations))
+
+    finally:
+        lamp.close()
+
+    worker = IOWorker(lambda: HL2000.open(RESOURCE_NAME, manager)).start()
+    try:
+        worker.submit("is_lamp_on").result()
+        results["worker.set_shutter"] = _summarize(
+            _time_calls(lambda i: worker.submit("set_shutter", i % 2 == 0).result(), iterations)
+        )
+        # call() without a setting is never coalesced, so every write reaches the lamp.
+        start = time.perf_counter()
+        futures = [worker.call(lambda driver, v=i % 2 == 0: driver.set_shutter(v)) for i in range(iterations)]
+        for future in futures:
+            future.result()
+        elapsed = time.perf_counter() - start
+        results["worker.pipelined_set_shutter"] = {"ops_per_s": iterations / elapsed}
+        coalesced = worker.coalesced
+        futures = [worker.submit("set_shutter", i % 2 == 0) for i in range(iterations)]
+        for future in futures:
+            future.result()
+        results["worker.coalesced_set_shutter"] = {
+            "submitted": float(iterations),
+            "coalesced": float(worker.coalesced - coalesced),
+        }
+    finally:
+        worker.stop()
+    results.update(run_pyvisa_write(iterations))
+    return results
+
+
+def run_pyvisa_write(iterations: int = 200) -> Dict[str, Dict[str, float]]:
+    """Time pyvisa's ``write()`` string path against ``write_raw`` of a precompiled frame.
+
+    Both go through a real :class:`pyvisa.resources.MessageBasedResource`
+    backed by pyvisa-sim, which has no serial timing model, so the difference
+    is the cost of formatting and encoding the command. Returns no cases if
+    pyvisa-sim is not installed.
+    """
+    try:
+        import pyvisa
+        import pyvisa_sim  # noqa: F401
+    except ImportError:
+        return {}
+    with tempfile.NamedTemporaryFile("w", suffix=".yaml", delete=False) as f:
+        f.write(_PYVISA_SIM_DEVICE)
+    resource_manager = pyvisa.ResourceManager(f"{f.name}@sim")
+    try:
+        resource = resource_manager.open_resource(
+            RESOURCE_NAME, write_termination=protocol.TERMINATION, read_termination=protocol.TERMINATION
+        )
+        frame = protocol.FRAMES[protocol.QUERY_SHUTTER]
+        return {
+            "pyvisa.write_string": _summarize(
+                _time_calls(lambda i: resource.write(protocol.QUERY_SHUTTER), iterations)
+            ),
+            "pyvisa.write_raw_frame": _summarize(_time_calls(lambda i: resource.write_raw(frame), iterations)),
+        }
+    finally:
+        resource_manager.close()
+        os.unlink(f.name)
+
+
+def run_startup(runs: int = 10) -> Tuple[Dict[str, Dict[str, float]], List[str]]:
+    """Measure startup in ``runs`` fresh interpreters.
+
+    Returns:
+        The timing cases and the heavy modules found loaded after the first
+        command.
+    """
+    env = dict(os.environ)
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env["PYTHONPATH"] = os.pathsep.join(filter(None, [root, env.get("PYTHONPATH")]))
+    imports, first_commands, processes = [], [], []
+    heavy: List[str] = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        out = subprocess.run(
+            [sys.executable, "-c", _STARTUP_SCRIPT], env=env, check=True, capture_output=True, text=True
+        ).stdout.split()
+        processes.append(time.perf_counter() - start)
+        imports.append(float(out[0]))
+        first_commands.append(float(out[1]))
+        heavy = out[2].split(",") if len(out) > 2 else []
+    results = {
+        "startup.import": _summarize(imports),
+        "startup.first_command": _summarize(first_commands),
+        "startup.process": _summarize(processes),
+    }
+    for metrics in results.values():
+        del metrics["ops_per_s"]
+    return results, heavy
+
+
+def format_report(results: Dict[str, Dict[str, float]]) -> str:
+    lines = [f"{'case':<34}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'ops/s':>12}"]
+    for case, metrics in results.items():
+        if "coalesced" in metrics:
+            lines.append(f"{case:<34}{metrics['coalesced']:.0f} of {metrics['submitted']:.0f} writes coalesced")
+            continue
+        cells = [f"{metrics[key]:>10.3f}" if key in metrics else f"{'-':>10}" for key in ("p50_ms", "p95_ms", "p99_ms")]
+        ops = f"{metrics['ops_per_s']:>12.1f}" if "ops_per_s" in metrics else f"{'-':>12}"
+        lines.append(f"{case:<34}{''.join(cells)}{ops}")
+    return "\n".join(lines)
+
+
+def compare(
+    results: Dict[str, Dict[str, float]], baseline: Dict[str, Dict[str, float]], tolerance: float
+) -> List[str]:
+    """Return a description of every metric slower than ``baseline`` by more than ``tolerance``."""
+    regressions = []
+    for case, metrics in baseline.items():
+        for key, reference in metrics.items():
+            if key not in GATED_METRICS or case not in results or key not in results[case]:
+                continue
+            value = results[case][key]
+            if key == "ops_per_s":
+                slower = value < reference * (1.0 - tolerance)
+            else:
+                slower = value > reference * (1.0 + tolerance)
+            if slower:
+                regressions.append(f"{case} {key}: {value:.3f} (baseline {reference:.3f})")
+    return regressions
+
+
+def main(argv: Sequence[str] = ()) -> int:
+    parser = argparse.ArgumentParser(prog="python -m lumed_hl2000.bench", description=__doc__.splitlines()[0])
+    parser.add_argument("-n", "--iterations", type=int, default=200)
+    parser.add_argument("--no-realtime", dest="realtime", action="store_false", help="disable the serial timing model")
+    parser.add_argument("--processing-delay", type=float, default=0.002, help="simulated lamp processing time [s]")
+    parser.add_argument("--startup-runs", type=int, default=10, help="fresh interpreters to start (0 to skip)")
+    parser.add_argument("-o", "--output", default="bench_output.txt")
+    parser.add_argument("--baseline", help="JSON baseline to compare against")
+    parser.add_argument("--save-baseline", help="write the results as a JSON baseline")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="allowed relative slowdown (default: 0.2)")
+    parser.add_argument("--replay", metavar="JOURNAL", help="also replay a recorded session as fast as possible")
+    args = parser.parse_args(list(argv) or None)
+
+    results = run(args.iterations, args.realtime, args.processing_delay)
+    if args.replay:
+        from .replay import load, replay
+
+        replayed = replay(load(args.replay), None, realtime=args.realtime, processing_delay=args.processing_delay)
+        results["replay"] = _summarize(replayed.latencies)
+    heavy: List[str] = []
+    if args.startup_runs:
+        startup, heavy = run_startup(args.startup_runs)
+        results.update(startup)
+    report = format_report(results)
+    if args.startup_runs:
+        report += f"\nModules loaded by a headless first command: {', '.join(heavy) or 'none of pyvisa, asyncio, PyQt5'}"
+    regressions: List[str] = []
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        report += "\n\n" + ("\n".join(["REGRESSIONS:"] + regressions) if regressions else "No regressions.")
+    print(report)
+    with open(args.output, "w") as f:
+        f.write(report + "\n")
+    if args.save_baseline:
+        with open(args.save_baseline, "w") as f:
+            json.dump(results, f, indent=2)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
@@ -0,0 +1,193 @@
+"""Headless command-line control of the lamp.
+
+Uses the same :class:`~.driver.HL2000` driver as the widget without importing
+Qt or starting an event loop::
+
+    python -m lumed_hl2000 shutter open
+    python -m lumed_hl2000 -r ASRL/dev/ttyUSB0::INSTR lamp off
+    python -m lumed_hl2000 status --json
+    python -m lumed_hl2000 sequence exposure.txt
+    python -m lumed_hl2000 pulses --period 0.1 --width 0.02 --count 50
+    python -m lumed_hl2000 serve                  # share the port with clients
+    python -m lumed_hl2000 --daemon shutter close # go through the daemon
+    python -m lumed_hl2000 --daemon-address 127.0.0.1:7232 status
+    python -m lumed_hl2000 --journal run.hl2j pulses --period 0.1 --width 0.02 --count 50
+
+Without ``--resource`` the lamp is found through the discovery cache.
+"""
+
+import argparse
+import json
+import sys
+from typing import TYPE_CHECKING, Any, List, Optional, Sequence, TextIO, Tuple
+
+from . import protocol
+from .errors import HL2000Error
+
+if TYPE_CHECKING:
+    from .driver import HL2000
+    from .sequence import SequenceResult, ShutterSequence
+
+_STATES = {"open": True, "close": False, "closed": False, "on": True, "off": False, "1": True, "0": False}
+
+
+def read_sequence(stream: TextIO) -> "ShutterSequence":
+    """Parse ``<offset seconds> <open|close>`` lines; ``#`` starts a comment."""
+    from .sequence import ShutterSequence
+
+    events: List[Tuple[float, bool]] = []
+    for number, line in enumerate(stream, 1):
+        fields = line.split("#", 1)[0].replace(",", " ").split()
+        if not fields:
+            continue
+        try:
+            offset, state = fields
+            events.append((float(offset), _STATES[state.lower()]))
+        except (ValueError, KeyError):
+            raise ValueError(f"line {number}: expected '<offset> <open|close>', got {line.strip()!r}") from None
+    return ShutterSequence(events)
+
+
+def _open(args: argparse.Namespace) -> Any:
+    """Open the lamp directly, or connect to the daemon with ``--daemon``."""
+    if args.daemon:
+        from .client import RemoteHL2000
+        from .daemon import parse_address
+
+        return RemoteHL2000(parse_address(args.daemon_address) if args.daemon_address else None)
+    return _open_driver(args)
+
+
+def _open_driver(args: argparse.Namespace) -> "HL2000":
+    from .driver import HL2000
+
+    resource_manager = None
+    if args.simulate:
+        from .sim import SimulatedResourceManager
+
+        resource_manager = SimulatedResourceManager((args.resource or "ASRL1::INSTR",))
+    resource_name = args.resource
+    if resource_name is None:
+        if resource_manager is not None:
+            resource_name = "ASRL1::INSTR"
+        else:
+            from .discovery import find_lamp
+
+            resource_name = find_lamp()
+    return HL2000.open(resource_name, resource_manager, timeout_ms=args.timeout)
+
+
+def _print_sequence_result(result: "SequenceResult") -> None:
+    status = "completed" if result.completed else "aborted"
+    print(f"{status}: {len(result.actual)} edges, max jitter {result.max_jitter * 1e3:.3f} ms")
+
+
+def _serve(args: argparse.Namespace) -> int:
+    from .daemon import parse_address, serve
+    from .worker import IOWorker
+
+    worker = IOWorker(lambda: _open_driver(args))
+    serve(worker, parse_address(args.listen) if args.listen else None, args.allow_remote)
+    return 0
+
+
+def _run(args: argparse.Namespace) -> int:
+    if args.action == "serve":
+        return _serve(args)
+    if args.action == "sequence":
+        # Parse before touching the port so a bad file never moves the shutter.
+        with (sys.stdin if args.file == "-" else open(args.file)) as stream:
+            sequence = read_sequence(stream)
+    elif args.action == "pulses":
+        from .sequence import ShutterSequence
+
+        sequence = ShutterSequence.pulses(args.period, args.width, args.count, args.delay)
+
+    with _open(args) as lamp:
+        if args.action == "shutter":
+            lamp.set_shutter(_STATES[args.state])
+        elif args.action == "lamp":
+            lamp.set_lamp(_STATES[args.state])
+        elif args.action == "status":
+            snapshot = lamp.snapshot()
+            status = {"shutter_open": snapshot.shutter_open, "lamp_on": snapshot.lamp_on}
+            if args.json:
+                print(json.dumps(status))
+            else:
+                print(f"shutter {'open' if status['shutter_open'] else 'closed'}")
+                print(f"lamp {'on' if status['lamp_on'] else 'off'}")
+        elif args.action in ("sequence", "pulses"):
+            if args.daemon:
+                result = lamp.play_sequence(sequence)
+            else:
+                player = lamp.start_sequence(sequence)
+                try:
+                    result = player.wait()
+                except KeyboardInterrupt:
+                    player.abort()
+                    result = player.wait()
+            _print_sequence_result(result)
+            if not result.completed:
+                return 1
+    return 0
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m lumed_hl2000", description="Control an HL-2000-HP-232R lamp.")
+    parser.add_argument("-r", "--resource", help="VISA resource name (default: auto-detect)")
+    parser.add_argument(
+        "--timeout",
+        type=int,
+        default=protocol.DEFAULT_TIMEOUT_MS,
+        help=f"initial read timeout in ms (default: {protocol.DEFAULT_TIMEOUT_MS})",
+    )
+    parser.add_argument("--simulate", action="store_true", help="talk to the built-in simulator")
+    parser.add_argument("--journal", metavar="FILE", help="append every command to a binary journal")
+    parser.add_argument("--daemon", action="store_true", help="send commands through a running daemon")
+    parser.add_argument(
+        "--daemon-address",
+        metavar="ADDRESS",
+        help="socket path or host:port of the daemon (implies --daemon; default: per-user socket)",
+    )
+    actions = parser.add_subparsers(dest="action", required=True)
+
+    shutter = actions.add_parser("shutter", help="open or close the shutter")
+    shutter.add_argument("state", choices=["open", "close"])
+    lamp = actions.add_parser("lamp", help="switch the lamp on or off")
+    lamp.add_argument("state", choices=["on", "off"])
+    status = actions.add_parser("status", help="print shutter and lamp state")
+    status.add_argument("--json", action="store_true", help="print a JSON object")
+
+    sequence = actions.add_parser("sequence", help="play a shutter sequence file ('-' for stdin)")
+    sequence.add_argument("file", help="lines of '<offset seconds> <open|close>'")
+    pulses = actions.add_parser("pulses", help="play a train of shutter pulses")
+    pulses.add_argument("--period", type=float, required=True, help="seconds between pulse starts")
+    pulses.add_argument("--width", type=float, required=True, help="seconds the shutter stays open")
+    pulses.add_argument("--count", type=int, required=True)
+    pulses.add_argument("--delay", type=float, default=0.0, help="seconds before the first pulse")
+
+    serve = actions.add_parser("serve", help="own the serial port and serve local clients")
+    serve.add_argument("--listen", metavar="ADDRESS", help="socket path or host:port (default: per-user socket)")
+    serve.add_argument(
+        "--allow-remote", action="store_true", help="accept a non-loopback --listen host (no authentication!)"
+    )
+    return parser
+
+
+def main(argv: Optional[Sequence[str]] = None) -> int:
+    parser = build_parser()
+    args = parser.parse_args(argv)
+    args.daemon = args.daemon or args.daemon_address is not None
+    journal = None
+    try:
+        if args.journal:
+            from .journal import Journal
+
+            journal = Journal(args.journal).attach()
+        return _run(args)
+    except (HL2000Error, ValueError, OSError) as exc:
+        print(f"error: {exc}", file=sys.stderr)
+        return 1
+    finally:
+        if journal is not None:
+            journal.close()
@@ -0,0 +1,171 @@
+"""Client of the control daemon with the same interface as the driver.
+
+:class:`RemoteHL2000` can be used anywhere an :class:`~.driver.HL2000` is
+expected, including as the opener of an :class:`~.worker.IOWorker`, so the
+widget and scripts work unchanged against a shared daemon::
+
+    worker = IOWorker(lambda: RemoteHL2000()).start()
+
+Requests are pipelined: :meth:`RemoteHL2000.submit` returns a future
+immediately, so a script can issue hundreds of commands without waiting for
+each reply::
+
+    futures = [lamp.submit("set_shutter", i % 2 == 0) for i in range(500)]
+    for future in futures:
+        future.result()
+"""
+
+import itertools
+import json
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Dict, Optional
+
+from .daemon import Address, connect, default_address, encode_request
+from .driver import StatusSnapshot
+from .errors import HL2000ClosedError, HL2000ProtocolError, HL2000RemoteError
+from .sequence import SequenceResult, ShutterSequence
+
+
+class RemoteHL2000:
+    """Blocking connection to a :class:`~.daemon.LampDaemon`.
+
+    Args:
+        address: Daemon address; defaults to :func:`~.daemon.default_address`.
+        timeout: Connection timeout in seconds.
+    """
+
+    def __init__(self, address: Optional[Address] = None, timeout: float = 5.0) -> None:
+        self.address = default_address() if address is None else address
+        self.resource_name = f"daemon:{self.address}"
+        self._sock = connect(self.address, timeout)
+        self._rfile = self._sock.makefile("rb")
+        self._lock = threading.Lock()
+        self._send_lock = threading.Lock()
+        self._closed = False
+        self._ids = itertools.count()
+        self._pending: Dict[str, "Future[Any]"] = {}
+        self._reader = threading.Thread(target=self._read_responses, name="hl2000-client", daemon=True)
+        self._reader.start()
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        try:
+            self._sock.shutdown(2)
+        except OSError:
+            pass
+        self._reader.join()
+        self._rfile.close()
+        self._sock.close()
+
+    def __enter__(self) -> "RemoteHL2000":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    def submit(self, method: str, *args: Any) -> "Future[Any]":
+        """Send one request without waiting; the future resolves with its result."""
+        future: "Future[Any]" = Future()
+        with self._lock:
+            if self._closed:
+                raise HL2000ClosedError("connection is closed")
+            request_id = format(next(self._ids), "x")
+            self._pending[request_id] = future
+        # Sending must not hold the lock the reader needs, or full socket
+        # buffers in both directions would deadlock.
+        try:
+            with self._send_lock:
+                self._sock.sendall(encode_request(request_id, method, *args))
+        except OSError:
+            with self._lock:
+                self._pending.pop(request_id, None)
+            raise
+        return future
+
+    def request(self, method: str, *args: Any) -> Any:
+        """Send one request and wait for its result."""
+        return self.submit(method, *args).result()
+
+    def _read_responses(self) -> None:
+        try:
+            for raw in self._rfile:
+                request_id, _, response = raw.decode("utf-8").partition(" ")
+                with self._lock:
+                    future = self._pending.pop(request_id, None)
+                if future is None:
+                    continue
+                try:
+                    future.set_result(_decode_response(response))
+                except Exception as exc:
+                    future.set_exception(exc)
+        except (OSError, ValueError):
+            pass
+        with self._lock:
+            pending, self._pending = self._pending, {}
+            self._closed = True
+        for future in pending.values():
+            # Same signal as a vanished serial port, so an IOWorker reconnects.
+            future.set_exception(ConnectionResetError("daemon closed the connection"))
+
+    def set_shutter(self, is_open: bool) -> None:
+        self.request("set_shutter", bool(is_open))
+
+    def open_shutter(self) -> None:
+        self.request("open_shutter")
+
+    def close_shutter(self) -> None:
+        self.request("close_shutter")
+
+    def is_shutter_open(self) -> bool:
+        return self.request("is_shutter_open")
+
+    def set_lamp(self, on: bool) -> None:
+        self.request("set_lamp", bool(on))
+
+    def lamp_on(self) -> None:
+        self.request("lamp_on")
+
+    def lamp_off(self) -> None:
+        self.request("lamp_off")
+
+    def is_lamp_on(self) -> bool:
+        return self.request("is_lamp_on")
+
+    def identify(self) -> str:
+        return self.request("identify")
+
+    def status(self) -> Dict[str, bool]:
+        """Shutter and lamp state, read in one request."""
+        return self.request("status")
+
+    def snapshot(self) -> StatusSnapshot:
+        """Shutter and lamp state as a :class:`~.driver.StatusSnapshot`."""
+        status = self.status()
+        return StatusSnapshot(status["shutter_open"], status["lamp_on"], time.time())
+
+    def play_sequence(self, sequence: ShutterSequence) -> SequenceResult:
+        """Play ``sequence`` in the daemon and wait for it to finish."""
+        result = self.request("play_sequence", sequence.events)
+        return SequenceResult(tuple(result["scheduled"]), tuple(result["actual"]), result["completed"])
+
+    def abort_sequence(self) -> None:
+        """Remote sequences cannot be aborted from a client; provided for interface parity."""
+
+
+def _decode_response(line: str) -> Any:
+    status, _, payload = line.rstrip("\n").partition(" ")
+    if status == "OK":
+        return json.loads(payload)
+    if status == "ERR":
+        remote_type, _, message = payload.partition(" ")
+        raise HL2000RemoteError(remote_type, message)
+    raise HL2000ProtocolError(f"unexpected daemon response {line!r}")
@@ -0,0 +1,315 @@
+"""Control daemon sharing one serial session between local clients.
+
+A serial port can only be opened by one process. The daemon opens it once,
+behind an :class:`~.worker.IOWorker`, and serves any number of local clients
+(widget, scripts, CLI) over a Unix socket or a localhost TCP port. Requests
+from all clients are serialized by the worker, so shutter and lamp writes are
+coalesced across clients too.
+
+Wire protocol, one UTF-8 line per message::
+
+    request:   <id> <method> [<json arg> ...]
+    response:  <id> OK <json result>
+               <id> ERR <exception type> <message>
+
+``<id>`` is any token without spaces chosen by the client. Requests are
+pipelined: a client may send many before reading any response. Each request
+is queued on the worker as soon as it is read, and responses are streamed
+back as the lamp answers them, so the serial link never idles waiting for a
+client round-trip. Responses carry the request's id and may arrive out of
+order (e.g. when a queued shutter write is superseded by a newer one).
+
+The protocol has no authentication. The Unix socket is created readable by
+its owner only, and TCP addresses must be loopback unless ``allow_remote`` is
+set.
+
+Start it with ``python -m lumed_hl2000 serve`` and connect with
+:class:`~.client.RemoteHL2000`.
+"""
+
+import dataclasses
+import ipaddress
+import json
+import os
+import queue
+import signal
+import socket
+import socketserver
+import sys
+import tempfile
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, List, Optional, Tuple, Union
+
+from .driver import HL2000
+from .worker import IOWorker
+
+Address = Union[str, Tuple[str, int]]
+
+DEFAULT_TCP_PORT = 7232
+
+#: Requests a single connection may have in flight before reading pauses.
+MAX_IN_FLIGHT = 1024
+
+#: Driver methods a client may call directly.
+DRIVER_METHODS = frozenset(
+    (
+        "set_shutter",
+        "open_shutter",
+        "close_shutter",
+        "is_shutter_open",
+        "set_lamp",
+        "lamp_on",
+        "lamp_off",
+        "is_lamp_on",
+        "identify",
+    )
+)
+
+
+def _status(driver: HL2000) -> Dict[str, Any]:
+    snapshot = driver.snapshot()
+    return {"shutter_open": snapshot.shutter_open, "lamp_on": snapshot.lamp_on}
+
+
+def _play_sequence(driver: HL2000, events: Any) -> Dict[str, Any]:
+    from .sequence import ShutterSequence
+
+    result = driver.play_sequence(ShutterSequence((float(t), bool(s)) for t, s in events))
+    return dataclasses.asdict(result)
+
+
+#: Requests that run a helper on the worker thread rather than one driver method.
+_CALLS: Dict[str, Callable[..., Any]] = {"status": _status, "play_sequence": _play_sequence}
+
+
+def default_address() -> Address:
+    """Unix socket in the user runtime directory, or localhost TCP on Windows."""
+    if not hasattr(socket, "AF_UNIX"):
+        return ("127.0.0.1", DEFAULT_TCP_PORT)
+    base = os.environ.get("XDG_RUNTIME_DIR") or tempfile.gettempdir()
+    return os.path.join(base, f"lumed_hl2000-{os.getuid()}.sock" if hasattr(os, "getuid") else "lumed_hl2000.sock")
+
+
+def parse_address(text: str) -> Address:
+    """Parse ``host:port`` (TCP) or a filesystem path (Unix socket)."""
+    host, sep, port = text.rpartition(":")
+    if sep and port.isdigit() and os.sep not in text:
+        return (host or "127.0.0.1", int(port))
+    return text
+
+
+def connect(address: Address, timeout: float = 5.0) -> socket.socket:
+    """Open a client connection to the daemon at ``address``."""
+    if isinstance(address, str):
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(timeout)
+        sock.connect(address)
+    else:
+        sock = socket.create_connection(address, timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+    sock.settimeout(None)
+    return sock
+
+
+def encode_request(request_id: str, method: str, *args: Any) -> bytes:
+    fields = [request_id, method, *(json.dumps(arg, separators=(",", ":")) for arg in args)]
+    return " ".join(fields).encode() + b"\n"
+
+
+def encode_response(request_id: str, future: "Future[Any]") -> bytes:
+    """Encode the outcome of a finished request."""
+    exc = future.exception()
+    if exc is None:
+        line = f"{request_id} OK {json.dumps(future.result(), separators=(',', ':'))}"
+    else:
+        message = str(exc).replace("\n", " ")
+        line = f"{request_id} ERR {type(exc).__name__} {message}"
+    return line.encode() + b"\n"
+
+
+def parse_request(line: str) -> Tuple[str, str, List[Any]]:
+    """Split a request line into id, method and decoded arguments."""
+    request_id, _, rest = line.strip().partition(" ")
+    method, _, rest = rest.strip().partition(" ")
+    if not method:
+        raise ValueError(f"malformed request {line.strip()!r}")
+    decoder = json.JSONDecoder()
+    args: List[Any] = []
+    rest = rest.strip()
+    while rest:
+        value, end = decoder.raw_decode(rest)
+        args.append(value)
+        rest = rest[end:].lstrip()
+    return request_id, method, args
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    """Read requests as fast as they arrive; a writer thread streams responses."""
+
+    server: "_Server"
+
+    def handle(self) -> None:
+        responses: "queue.Queue[Optional[bytes]]" = queue.Queue()
+        in_flight = threading.BoundedSemaphore(MAX_IN_FLIGHT)
+        writer = threading.Thread(target=self._write_responses, args=(responses,), daemon=True)
+        writer.start()
+
+        def respond(request_id: str, future: "Future[Any]") -> None:
+            responses.put(encode_response(request_id, future))
+            in_flight.release()
+
+        try:
+            for raw in self.rfile:
+                line = raw.decode("utf-8", "replace").strip()
+                if not line:
+                    continue
+                in_flight.acquire()
+                request_id = line.partition(" ")[0]
+                future = self.server.daemon.submit(line)
+                future.add_done_callback(lambda f, request_id=request_id: respond(request_id, f))
+        finally:
+            # Let in-flight requests finish so their responses are flushed.
+            for _ in range(MAX_IN_FLIGHT):
+                in_flight.acquire()
+            responses.put(None)
+            writer.join()
+
+    def _write_responses(self, responses: "queue.Queue[Optional[bytes]]") -> None:
+        broken = False
+        while True:
+            chunks = [responses.get()]
+            # Coalesce everything already answered into a single write.
+            while chunks[-1] is not None:
+                try:
+                    chunks.append(responses.get_nowait())
+                except queue.Empty:
+                    break
+            done = chunks[-1] is None
+            if not broken:
+                try:
+                    self.wfile.write(b"".join(c for c in chunks if c is not None))
+                    self.wfile.flush()
+                except OSError:
+                    broken = True
+            if done:
+                return
+
+
+class _Server(socketserver.ThreadingMixIn, socketserver.BaseServer):
+    daemon_threads = True
+    daemon: "LampDaemon"
+
+
+class _UnixServer(_Server, socketserver.UnixStreamServer):
+    pass
+
+
+class _TCPServer(_Server, socketserver.TCPServer):
+    allow_reuse_address = True
+
+
+class LampDaemon:
+    """Serve one lamp's worker to local clients.
+
+    Args:
+        worker: Worker owning the serial session; started if needed and
+            stopped by :meth:`close`.
+        address: Unix socket path or ``(host, port)``. Defaults to
+            :func:`default_address`.
+        allow_remote: Accept a TCP host other than a loopback address.
+
+    Raises:
+        ValueError: ``address`` is not a loopback host and ``allow_remote``
+            is False.
+    """
+
+    def __init__(self, worker: IOWorker, address: Optional[Address] = None, allow_remote: bool = False) -> None:
+        self.worker = worker
+        self.address: Address = default_address() if address is None else address
+        if isinstance(self.address, str):
+            _remove_stale_socket(self.address)
+            # Created with owner-only permissions; a chmod afterwards leaves a window.
+            umask = os.umask(0o177)
+            try:
+                self._server: _Server = _UnixServer(self.address, _Handler)
+            finally:
+                os.umask(umask)
+        else:
+            if not allow_remote and not _is_loopback(self.address[0]):
+                raise ValueError(f"refusing to listen on non-loopback host {self.address[0]!r} without allow_remote")
+            self._server = _TCPServer(self.address, _Handler)
+            self.address = self._server.server_address[:2]
+        self._server.daemon = self
+
+    def submit(self, line: str) -> "Future[Any]":
+        """Queue one request line on the worker and return its future."""
+        try:
+            _, method, args = parse_request(line)
+            if method in DRIVER_METHODS:
+                return self.worker.submit(method, *args)
+            if method in _CALLS:
+                fn = _CALLS[method]
+                return self.worker.call(lambda driver: fn(driver, *args))
+            raise ValueError(f"unknown method {method!r}")
+        except Exception as exc:
+            future: "Future[Any]" = Future()
+            future.set_exception(exc)
+            return future
+
+    def serve_forever(self) -> None:
+        if not self.worker.running:
+            self.worker.start()
+        self._server.serve_forever()
+
+    def shutdown(self) -> None:
+        """Stop :meth:`serve_forever` from another thread."""
+        self._server.shutdown()
+
+    def close(self) -> None:
+        self._server.server_close()
+        if isinstance(self.address, str):
+            try:
+                os.unlink(self.address)
+            except OSError:
+                pass
+        self.worker.stop()
+
+
+def _remove_stale_socket(path: str) -> None:
+    """Delete a socket file left by a dead daemon; refuse if one is listening."""
+    if not os.path.exists(path):
+        return
+    try:
+        connect(path, timeout=0.5).close()
+    except OSError:
+        os.unlink(path)
+        return
+    raise OSError(f"a daemon is already listening on {path}")
+
+
+def _is_loopback(host: str) -> bool:
+    if host == "localhost":
+        return True
+    try:
+        return ipaddress.ip_address(host).is_loopback
+    except ValueError:
+        return False
+
+
+def _interrupt(signum: int, frame: Any) -> None:
+    raise KeyboardInterrupt
+
+
+def serve(worker: IOWorker, address: Optional[Address] = None, allow_remote: bool = False) -> None:
+    """Run a daemon until interrupted (SIGINT or SIGTERM)."""
+    if threading.current_thread() is threading.main_thread():
+        signal.signal(signal.SIGTERM, _interrupt)
+    daemon = LampDaemon(worker, address, allow_remote)
+    print(f"serving on {daemon.address}", file=sys.stderr)
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        daemon.close()
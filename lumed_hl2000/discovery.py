@@ -0,0 +1,225 @@
+"""Finding HL-2000-HP-232R lamps among the serial ports.
+
+Confirmed ports are remembered in a small JSON cache. On the next launch each
+cached port is revalidated with a single identity query; the full
+``list_resources()`` sweep, which probes every serial adapter on the machine,
+only runs when no cached port answers. Probes run concurrently in a thread
+pool with a short timeout, so auto-detection takes about one probe timeout
+regardless of the number of adapters.
+"""
+
+import dataclasses
+import json
+import os
+import sys
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor
+from concurrent.futures import wait as wait_futures
+from typing import TYPE_CHECKING, Any, Dict, Iterable, List, Optional
+
+from . import protocol
+from .driver import HL2000
+from .errors import HL2000Error
+from .timeouts import FixedTimeout
+
+if TYPE_CHECKING:
+    import pyvisa
+
+#: Timeout of an identification probe, in milliseconds.
+PROBE_TIMEOUT_MS = 200
+
+#: Upper bound on concurrent probes.
+MAX_PROBE_THREADS = 32
+
+
+def default_cache_path() -> str:
+    """Location of the discovery cache.
+
+    ``$LUMED_HL2000_CACHE`` if set, otherwise ``discovery.json`` in the user
+    cache directory (``%LOCALAPPDATA%`` on Windows, ``$XDG_CACHE_HOME`` or
+    ``~/.cache`` elsewhere).
+    """
+    path = os.environ.get("LUMED_HL2000_CACHE")
+    if path:
+        return path
+    if sys.platform == "win32":
+        base = os.environ.get("LOCALAPPDATA", os.path.expanduser("~"))
+    else:
+        base = os.environ.get("XDG_CACHE_HOME", os.path.join(os.path.expanduser("~"), ".cache"))
+    return os.path.join(base, "lumed_hl2000", "discovery.json")
+
+
+@dataclasses.dataclass
+class DiscoveryEntry:
+    """A port confirmed to host a lamp.
+
+    Attributes:
+        resource_name: VISA resource name of the port.
+        identity: Identity string returned by the lamp.
+        last_seen: ``time.time()`` of the last successful probe.
+    """
+
+    resource_name: str
+    identity: str = ""
+    last_seen: float = 0.0
+
+
+class DiscoveryCache:
+    """Persistent map of resource name to :class:`DiscoveryEntry`.
+
+    The file is read on first access and written atomically by :meth:`save`.
+    An unreadable or corrupt file is treated as empty.
+    """
+
+    def __init__(self, path: Optional[str] = None) -> None:
+        self.path = default_cache_path() if path is None else path
+        self._entries: Optional[Dict[str, DiscoveryEntry]] = None
+
+    @property
+    def entries(self) -> Dict[str, DiscoveryEntry]:
+        if self._entries is None:
+            self._entries = self._load()
+        return self._entries
+
+    def _load(self) -> Dict[str, DiscoveryEntry]:
+        try:
+            with open(self.path) as f:
+                raw = json.load(f)
+            # Ignore keys of older versions, such as the unused baud_rate.
+            fields = {field.name for field in dataclasses.fields(DiscoveryEntry)}
+            return {
+                item["resource_name"]: DiscoveryEntry(**{k: v for k, v in item.items() if k in fields})
+                for item in raw["lamps"]
+            }
+        except (OSError, ValueError, KeyError, TypeError):
+            return {}
+
+    def remember(self, entry: DiscoveryEntry) -> None:
+        self.entries[entry.resource_name] = entry
+
+    def forget(self, resource_name: str) -> None:
+        self.entries.pop(resource_name, None)
+
+    def save(self) -> None:
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp = f"{self.path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            json.dump({"lamps": [dataclasses.asdict(e) for e in self.entries.values()]}, f, indent=2)
+        os.replace(tmp, self.path)
+
+
+def probe(
+    resource_manager: "pyvisa.ResourceManager",
+    resource_name: str,
+    timeout_ms: int = PROBE_TIMEOUT_MS,
+) -> Optional[DiscoveryEntry]:
+    """Open ``resource_name``, ask for its identity and close it again.
+
+    Returns:
+        An entry for the port if a lamp answered, None otherwise.
+    """
+    try:
+        with HL2000.open(resource_name, resource_manager, timeout_ms, FixedTimeout(timeout_ms)) as lamp:
+            identity = lamp.identify()
+    except Exception:
+        return None
+    return DiscoveryEntry(resource_name, identity, time.time())
+
+
+def probe_many(
+    resource_manager: "pyvisa.ResourceManager",
+    resource_names: Iterable[str],
+    timeout_ms: int = PROBE_TIMEOUT_MS,
+    first: bool = False,
+) -> Dict[str, Optional[DiscoveryEntry]]:
+    """Probe ``resource_names`` concurrently.
+
+    Args:
+        first: Return as soon as one lamp answers. Probes that have not
+            finished by then are left out of the result and finish in the
+            background.
+
+    Returns:
+        ``{resource_name: entry or None}`` for every finished probe, in the
+        order of ``resource_names``.
+    """
+    names = list(dict.fromkeys(resource_names))
+    if not names:
+        return {}
+    executor = ThreadPoolExecutor(min(len(names), MAX_PROBE_THREADS), thread_name_prefix="hl2000-probe")
+    futures = {executor.submit(probe, resource_manager, name, timeout_ms): name for name in names}
+    pending = set(futures)
+    try:
+        while pending:
+            done, pending = wait_futures(pending, return_when=FIRST_COMPLETED)
+            if first and any(f.result() is not None for f in done):
+                break
+    finally:
+        executor.shutdown(wait=not pending, cancel_futures=True)
+    results = {futures[f]: f.result() for f in futures if f not in pending and not f.cancelled()}
+    return {name: results[name] for name in names if name in results}
+
+
+def _is_serial(resource_name: str) -> bool:
+    return resource_name.upper().startswith("ASRL")
+
+
+def _record(cache: DiscoveryCache, results: Dict[str, Optional[DiscoveryEntry]]) -> List[str]:
+    """Apply probe results to ``cache`` and return the ports that answered."""
+    for name, entry in results.items():
+        if entry is None:
+            cache.forget(name)
+        else:
+            cache.remember(entry)
+    return [name for name, entry in results.items() if entry is not None]
+
+
+def find_lamps(
+    resource_manager: Optional["pyvisa.ResourceManager"] = None,
+    cache: Optional[DiscoveryCache] = None,
+    scan: bool = True,
+    timeout_ms: int = PROBE_TIMEOUT_MS,
+    first: bool = False,
+) -> List[str]:
+    """Return the resource names of the connected lamps.
+
+    Cached ports are revalidated first; ports are only scanned when none of
+    them answers (and ``scan`` is True). The cache is updated and saved.
+
+    Args:
+        first: Stop at the first port that answers instead of probing all.
+    """
+    if resource_manager is None:
+        import pyvisa
+
+        resource_manager = pyvisa.ResourceManager()
+    if cache is None:
+        cache = DiscoveryCache()
+
+    found = _record(cache, probe_many(resource_manager, list(cache.entries), timeout_ms, first))
+    if not found and scan:
+        candidates = [name for name in resource_manager.list_resources() if _is_serial(name)]
+        found = _record(cache, probe_many(resource_manager, candidates, timeout_ms, first))
+
+    try:
+        cache.save()
+    except OSError:
+        pass
+    return found
+
+
+def find_lamp(**kwargs: Any) -> str:
+    """Return the resource name of one connected lamp.
+
+    Keyword arguments are passed to :func:`find_lamps`.
+
+    Raises:
+        HL2000Error: No lamp answered.
+    """
+    kwargs.setdefault("first", True)
+    found = find_lamps(**kwargs)
+    if not found:
+        raise HL2000Error(f"no {protocol.IDENTITY_PREFIX} found")
+    return found[0]
@@ -0,0 +1,389 @@
+"""Blocking pyvisa driver for the HL-2000-HP-232R light source."""
+
+import contextlib
+import dataclasses
+import threading
+import time
+from typing import TYPE_CHECKING, Any, Iterator, List, Optional, Tuple
+
+from . import protocol
+from . import instrumentation as _instrumentation
+from .errors import HL2000ClosedError, HL2000CommandError, HL2000Error, HL2000ProtocolError
+from .framing import ReplyParser
+from .timeouts import AdaptiveTimeout
+
+if TYPE_CHECKING:
+    import pyvisa
+
+    from .sequence import SequencePlayer, SequenceResult, ShutterSequence
+
+#: VI_ERROR_TMO, the status code of a pyvisa read timeout.
+_VI_ERROR_TMO = -1073807339
+
+#: pyvisa status codes meaning the port itself is gone: connection lost,
+#: I/O error, invalid object, resource not found.
+_VI_LINK_ERRORS = frozenset((-1073807194, -1073807298, -1073807346, -1073807343))
+
+
+def is_timeout(exc: BaseException) -> bool:
+    """Return True if ``exc`` is a read timeout, without importing pyvisa."""
+    return isinstance(exc, TimeoutError) or getattr(exc, "error_code", None) == _VI_ERROR_TMO
+
+
+def is_link_error(exc: BaseException) -> bool:
+    """Return True if ``exc`` means the serial link was lost (e.g. adapter unplugged)."""
+    if is_timeout(exc):
+        return False
+    if isinstance(exc, OSError) or type(exc).__name__ == "InvalidSession":
+        return True
+    return getattr(exc, "error_code", None) in _VI_LINK_ERRORS
+
+
+@dataclasses.dataclass(frozen=True)
+class StatusSnapshot:
+    """Every status field of the lamp, read in one batched transaction.
+
+    Attributes:
+        shutter_open: Shutter position.
+        lamp_on: Lamp power.
+        timestamp: ``time.time()`` when the replies were received.
+    """
+
+    shutter_open: bool
+    lamp_on: bool
+    timestamp: float
+
+
+class HL2000:
+    """Blocking driver around an open pyvisa serial resource.
+
+    Every method performs a full serial round-trip and therefore blocks the
+    calling thread; GUI code should go through :class:`~.worker.IOWorker`
+    instead of calling the driver directly. Calls are serialized by an
+    internal lock so a driver may be shared between threads.
+
+    Args:
+        resource: An open pyvisa message-based resource (or any object with
+            the same ``write_raw``/``read_bytes``/``bytes_in_buffer``/``close``
+            interface).
+        timeout_policy: Read timeout and retry policy. Defaults to an
+            :class:`~.timeouts.AdaptiveTimeout` starting from the resource's
+            current timeout.
+        instrumentation: Receives a :class:`~.instrumentation.CommandEvent`
+            for every command. Defaults to
+            :data:`lumed_hl2000.instrumentation.default`.
+    """
+
+    def __init__(
+        self,
+        resource: Any,
+        timeout_policy: Optional[AdaptiveTimeout] = None,
+        instrumentation: Optional[_instrumentation.Instrumentation] = None,
+    ) -> None:
+        self._resource = resource
+        self.resource_name: str = getattr(resource, "resource_name", "")
+        self.instrumentation = _instrumentation.default if instrumentation is None else instrumentation
+        if timeout_policy is None:
+            timeout_policy = AdaptiveTimeout(getattr(resource, "timeout", None) or protocol.DEFAULT_TIMEOUT_MS)
+        self.timeout_policy = timeout_policy
+        self._lock = threading.RLock()
+        self._closed = False
+        self._player: Optional["SequencePlayer"] = None
+        # Guards _player only; the I/O lock is held by a playing sequence.
+        self._player_lock = threading.Lock()
+        self._parser = ReplyParser(getattr(resource, "read_termination", None) or protocol.TERMINATION)
+
+    @classmethod
+    def open(
+        cls,
+        resource_name: str,
+        resource_manager: Optional["pyvisa.ResourceManager"] = None,
+        timeout_ms: int = protocol.DEFAULT_TIMEOUT_MS,
+        timeout_policy: Optional[AdaptiveTimeout] = None,
+    ) -> "HL2000":
+        """Open ``resource_name`` with the lamp's serial settings.
+
+        pyvisa is imported here rather than at module level, so scripts that
+        never open a real port do not pay for loading it.
+
+        Args:
+            timeout_ms: Initial read timeout.
+            timeout_policy: Passed to the constructor.
+        """
+        if resource_manager is None:
+            import pyvisa
+
+            resource_manager = pyvisa.ResourceManager()
+        resource = resource_manager.open_resource(
+            resource_name,
+            baud_rate=protocol.BAUD_RATE,
+            data_bits=protocol.DATA_BITS,
+            read_termination=protocol.TERMINATION,
+            write_termination=protocol.TERMINATION,
+            timeout=timeout_ms,
+        )
+        return cls(resource, timeout_policy)
+
+    @property
+    def resource(self) -> Any:
+        """The underlying pyvisa resource."""
+        return self._resource
+
+    @property
+    def closed(self) -> bool:
+        return self._closed
+
+    def close(self) -> None:
+        """Close the serial resource. Closing twice is a no-op."""
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._resource.close()
+
+    def __enter__(self) -> "HL2000":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+    @contextlib.contextmanager
+    def exclusive(self) -> Iterator[Any]:
+        """Hold the I/O lock and yield the raw resource.
+
+        Every other caller of the driver blocks until the block exits; used
+        by time-critical code that talks to the resource directly.
+        """
+        with self._lock:
+            if self._closed:
+                raise HL2000ClosedError("driver is closed")
+            yield self._resource
+
+    # ------------------------------------------------------------------ I/O
+
+    def _exchange(self, frame: bytes, count: int, timeout_ms: float) -> List[Optional[str]]:
+        """Write ``frame`` and read ``count`` replies under one lock acquisition."""
+        with self._lock:
+            if self._closed:
+                raise HL2000ClosedError("driver is closed")
+            resource = self._resource
+            if resource.timeout != timeout_ms:
+                resource.timeout = timeout_ms
+            self.write_frame(frame)
+            return [self.read_reply() for _ in range(count)]
+
+    def write_frame(self, frame: bytes) -> None:
+        """Drop stale input, then write ``frame``.
+
+        Replies left over from an earlier exchange (one split in two by line
+        noise, one that arrived after its timeout) are discarded first, so
+        the next replies read answer ``frame``. Callers talking to the
+        resource inside :meth:`exclusive` use this instead of ``write_raw``.
+        """
+        with self._lock:
+            resource = self._resource
+            self._parser.reset()
+            pending = resource.bytes_in_buffer
+            if pending:
+                resource.read_bytes(pending)
+            resource.write_raw(frame)
+
+    def read_reply(self) -> Optional[str]:
+        """Read the next reply from the port; None if its frame was corrupted.
+
+        Consumes whatever the port has buffered, blocking for at least one
+        byte (up to the read timeout) only when nothing is buffered. Callers
+        talking to the resource inside :meth:`exclusive` use this instead of
+        ``resource.read()`` so that line noise is skipped without a timeout.
+        """
+        parser = self._parser
+        with self._lock:
+            resource = self._resource
+            while not parser:
+                parser.feed(resource.read_bytes(max(resource.bytes_in_buffer, 1)))
+            return parser.pop()
+
+    def _discard_input(self) -> None:
+        # A late reply to the timed-out command must not be read as the answer to the retry.
+        with self._lock:
+            self._parser.reset()
+            try:
+                self._resource.clear()
+            except Exception:
+                pass
+
+    def _transact(self, command: str) -> str:
+        return self._transact_many((command,))[0]
+
+    def _transact_many(self, commands: Tuple[str, ...]) -> List[str]:
+        """Send ``commands`` back to back and return their stripped replies.
+
+        Retries apply to the whole batch, after a timeout, a corrupted reply
+        or a reply of the wrong kind for its command (see
+        :func:`~.protocol.reply_matches`). Batched commands share the batch
+        latency evenly in their instrumentation events.
+        """
+        policy = self.timeout_policy
+        frame = protocol.encode(*commands)
+        attempt = 0
+        replies: List[Optional[str]] = []
+        error: Optional[BaseException] = None
+        issued = time.perf_counter()
+        try:
+            while True:
+                start = time.perf_counter()
+                try:
+                    replies = self._exchange(frame, len(commands), policy.timeout_for(attempt))
+                except Exception as exc:
+                    if not is_timeout(exc) or attempt >= policy.retries:
+                        raise
+                    policy.record_failure()
+                    self._discard_input()
+                    attempt += 1
+                    time.sleep(policy.delay_before(attempt))
+                    continue
+                replies = [None if reply is None else reply.strip() for reply in replies]
+                in_step = all(
+                    reply is not None and protocol.reply_matches(command, reply)
+                    for command, reply in zip(commands, replies)
+                )
+                if not in_step and attempt < policy.retries:
+                    # Corrupted or out of step; write_frame drops what is left, so resend at once.
+                    attempt += 1
+                    continue
+                policy.record((time.perf_counter() - start) / len(commands))
+                break
+            for command, reply in zip(commands, replies):
+                if reply is None:
+                    raise HL2000ProtocolError(f"{command!r}: corrupted reply")
+                if protocol.is_error(reply):
+                    raise HL2000CommandError(command, reply)
+                if not protocol.reply_matches(command, reply):
+                    raise HL2000ProtocolError(f"{command!r}: unexpected reply {reply!r}")
+            return replies  # type: ignore[return-value]
+        except BaseException as exc:
+            error = exc
+            raise
+        finally:
+            if self.instrumentation.active:
+                latency = (time.perf_counter() - issued) / len(commands)
+                for i, command in enumerate(commands):
+                    reply = replies[i] if i < len(replies) else None
+                    self.report_command(command, reply, latency, attempt, error)
+
+    def report_command(
+        self, command: str, reply: Optional[str], latency: float, retries: int, error: Optional[BaseException]
+    ) -> None:
+        """Emit a :class:`~.instrumentation.CommandEvent` for an exchange done outside :meth:`_transact`."""
+        termination = len(protocol.TERMINATION)
+        self.instrumentation.emit(
+            _instrumentation.CommandEvent(
+                resource_name=self.resource_name,
+                command=command,
+                bytes_sent=(len(command) + termination) * (retries + 1),
+                bytes_received=0 if reply is None else len(reply) + termination,
+                reply=reply,
+                latency=latency,
+                retries=retries,
+                error=error,
+                timestamp=time.time() - latency,
+            )
+        )
+
+    def _command(self, command: str) -> None:
+        reply = self._transact(command)
+        if reply != protocol.ACK:
+            raise HL2000ProtocolError(f"{command!r}: expected {protocol.ACK!r}, got {reply!r}")
+
+    def _query_flag(self, command: str) -> bool:
+        return self._parse_flag(command, self._transact(command))
+
+    @staticmethod
+    def _parse_flag(command: str, reply: str) -> bool:
+        try:
+            return protocol.parse_flag(reply)
+        except ValueError as exc:
+            raise HL2000ProtocolError(f"{command!r}: {exc}") from None
+
+    def snapshot(self) -> StatusSnapshot:
+        """Read every status field in one batched transaction.
+
+        All queries are written in a single buffer and their replies read
+        back to back while holding the lock once, which costs one serial
+        turnaround instead of one per field.
+        """
+        commands = tuple(protocol.STATUS_QUERIES.values())
+        replies = self._transact_many(commands)
+        fields = {
+            name: self._parse_flag(command, reply)
+            for (name, command), reply in zip(protocol.STATUS_QUERIES.items(), replies)
+        }
+        return StatusSnapshot(timestamp=time.time(), **fields)
+
+    def identify(self) -> str:
+        """Return the lamp's identity string.
+
+        Raises:
+            HL2000ProtocolError: The device does not identify as an
+                HL-2000-HP-232R.
+        """
+        reply = self._transact(protocol.QUERY_IDENTITY)
+        if not reply.startswith(protocol.IDENTITY_PREFIX):
+            raise HL2000ProtocolError(f"not an {protocol.IDENTITY_PREFIX}: {reply!r}")
+        return reply
+
+    # ------------------------------------------------------------- shutter
+
+    def set_shutter(self, is_open: bool) -> None:
+        self._command(protocol.SHUTTER_OPEN if is_open else protocol.SHUTTER_CLOSE)
+
+    def open_shutter(self) -> None:
+        self.set_shutter(True)
+
+    def close_shutter(self) -> None:
+        self.set_shutter(False)
+
+    def is_shutter_open(self) -> bool:
+        return self._query_flag(protocol.QUERY_SHUTTER)
+
+    # ---------------------------------------------------------------- lamp
+
+    def set_lamp(self, on: bool) -> None:
+        self._command(protocol.LAMP_ON if on else protocol.LAMP_OFF)
+
+    def lamp_on(self) -> None:
+        self.set_lamp(True)
+
+    def lamp_off(self) -> None:
+        self.set_lamp(False)
+
+    def is_lamp_on(self) -> bool:
+        return self._query_flag(protocol.QUERY_LAMP)
+
+    # ------------------------------------------------------------ sequences
+
+    def start_sequence(self, sequence: "ShutterSequence", **kwargs: Any) -> "SequencePlayer":
+        """Start playing ``sequence`` on a dedicated thread and return its player.
+
+        Keyword arguments are passed to :class:`~.sequence.SequencePlayer`.
+
+        Raises:
+            HL2000Error: Another sequence is still playing.
+        """
+        from .sequence import SequencePlayer
+
+        with self._player_lock:
+            if self._player is not None and self._player.playing:
+                raise HL2000Error("a sequence is already playing")
+            self._player = SequencePlayer(self, sequence, **kwargs)
+            return self._player.start()
+
+    def play_sequence(self, sequence: "ShutterSequence", **kwargs: Any) -> "SequenceResult":
+        """Play ``sequence`` and block until it has finished."""
+        return self.start_sequence(sequence, **kwargs).wait()
+
+    def abort_sequence(self) -> None:
+        """Abort the sequence being played, if any. Does not wait for the lock."""
+        player = self._player
+        if player is not None:
+            player.abort()
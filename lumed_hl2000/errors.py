@@ -0,0 +1,34 @@
+"""Exceptions raised by the HL-2000-HP-232R control stack."""
+
+
+class HL2000Error(Exception):
+    """Base class for every error raised by this package."""
+
+
+class HL2000CommandError(HL2000Error):
+    """The lamp answered a command with an error reply."""
+
+    def __init__(self, command: str, reply: str) -> None:
+        super().__init__(f"{command!r} rejected by lamp: {reply!r}")
+        self.command = command
+        self.reply = reply
+
+
+class HL2000ProtocolError(HL2000Error):
+    """The lamp sent a reply that could not be understood."""
+
+
+class HL2000ClosedError(HL2000Error):
+    """The driver or worker was used after being closed."""
+
+
+class HL2000RemoteError(HL2000Error):
+    """The control daemon reported an error while running a request.
+
+    Attributes:
+        remote_type: Name of the exception class raised in the daemon.
+    """
+
+    def __init__(self, remote_type: str, message: str) -> None:
+        super().__init__(f"{remote_type}: {message}")
+        self.remote_type = remote_type
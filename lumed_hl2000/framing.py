@@ -0,0 +1,102 @@
+"""Incremental parser turning raw serial bytes into lamp replies.
+
+The driver reads whatever the port has buffered and feeds it to a
+:class:`ReplyParser` instead of asking pyvisa to read up to the termination
+character. Garbage on the line therefore never costs a read timeout: the
+parser drops it as soon as it is seen and resynchronises on the next
+terminator, reporting the damaged frame as a corrupted reply.
+
+A frame is corrupted if it contains a byte outside printable ASCII or grows
+past :data:`MAX_REPLY_LENGTH` without a terminator. Non-printable bytes
+before the first character of a frame (idle-line noise, a stray line feed)
+are discarded without affecting the reply, and frames holding nothing else
+are ignored.
+"""
+
+from collections import deque
+from typing import Deque, Optional
+
+from . import protocol
+
+#: Longest valid reply, terminator excluded; the identity string is the longest.
+MAX_REPLY_LENGTH = 64
+
+_PRINTABLE = frozenset(range(0x20, 0x7F))
+
+
+class ReplyParser:
+    """Split a byte stream into replies, resynchronising after line noise.
+
+    The receive buffer is a single :class:`bytearray` reused for the whole
+    session; complete frames are cut from its front in place.
+
+    Args:
+        termination: Reply terminator.
+        max_length: Frames longer than this without a terminator are
+            reported as corrupted and skipped up to the next terminator.
+    """
+
+    def __init__(self, termination: str = protocol.TERMINATION, max_length: int = MAX_REPLY_LENGTH) -> None:
+        self._terminator = termination.encode("ascii")
+        self._max_length = max_length
+        self._buffer = bytearray()
+        self._replies: Deque[Optional[str]] = deque()
+        # True while skipping the rest of an overlong frame.
+        self._skipping = False
+        #: Corrupted frames seen since the parser was created.
+        self.corrupted = 0
+
+    def __len__(self) -> int:
+        """Number of complete replies waiting to be popped."""
+        return len(self._replies)
+
+    def feed(self, data: bytes) -> None:
+        """Consume ``data`` and queue every reply it completes."""
+        buffer = self._buffer
+        buffer += data
+        terminator = self._terminator
+        start = 0
+        while True:
+            end = buffer.find(terminator, start)
+            if end < 0:
+                break
+            if self._skipping:
+                self._skipping = False
+            else:
+                self._frame(buffer, start, end)
+            start = end + len(terminator)
+        del buffer[:start]
+        if not self._skipping and len(buffer) > self._max_length:
+            self._corrupt()
+            self._skipping = True
+        if self._skipping:
+            buffer.clear()
+
+    def _frame(self, buffer: bytearray, start: int, end: int) -> None:
+        while start < end and buffer[start] not in _PRINTABLE:
+            start += 1
+        if start == end:
+            return  # Noise or a stray terminator, not a reply.
+        for i in range(start, end):
+            if buffer[i] not in _PRINTABLE:
+                self._corrupt()
+                return
+        self._replies.append(buffer[start:end].decode("ascii"))
+
+    def _corrupt(self) -> None:
+        self.corrupted += 1
+        self._replies.append(None)
+
+    def pop(self) -> Optional[str]:
+        """Return the oldest complete reply, or None if that frame was corrupted.
+
+        Raises:
+            IndexError: No complete reply is waiting.
+        """
+        return self._replies.popleft()
+
+    def reset(self) -> None:
+        """Drop buffered bytes and unread replies."""
+        self._buffer.clear()
+        self._replies.clear()
+        self._skipping = False
@@ -0,0 +1,89 @@
+"""Hooks observing every command sent to a lamp.
+
+Drivers report each exchange as a :class:`CommandEvent` to their
+:class:`Instrumentation`. With no listener attached, reporting costs one
+attribute check per command; listeners are called synchronously on the
+thread doing the I/O and should therefore be quick.
+
+By default every driver reports to the module-level :data:`default`
+instance, so a single listener sees the traffic of all lamps::
+
+    from lumed_hl2000 import instrumentation
+
+    instrumentation.default.add_listener(lambda event: print(event))
+"""
+
+import dataclasses
+import threading
+from typing import Callable, List, Optional, Tuple
+
+Listener = Callable[["CommandEvent"], None]
+
+
+@dataclasses.dataclass(frozen=True)
+class CommandEvent:
+    """One command exchanged with the lamp.
+
+    Attributes:
+        resource_name: Port the command was sent to.
+        command: Command token, e.g. ``"S1"``.
+        bytes_sent: Bytes written, including retries and terminators.
+        bytes_received: Bytes of the final reply, including its terminator;
+            0 if no reply was received.
+        reply: Final reply without terminator, None if none was received.
+        latency: Seconds from the first write to the final reply or error.
+        retries: Attempts beyond the first one.
+        error: Exception raised to the caller, if any.
+        timestamp: ``time.time()`` at which the command was issued.
+    """
+
+    resource_name: str
+    command: str
+    bytes_sent: int
+    bytes_received: int
+    reply: Optional[str]
+    latency: float
+    retries: int
+    error: Optional[BaseException]
+    timestamp: float
+
+
+class Instrumentation:
+    """Fan :class:`CommandEvent` objects out to listeners.
+
+    A listener that raises is ignored for that event; it never affects the
+    command being reported.
+    """
+
+    def __init__(self) -> None:
+        self._listeners: Tuple[Listener, ...] = ()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self) -> bool:
+        """True if at least one listener is attached."""
+        return bool(self._listeners)
+
+    def add_listener(self, listener: Listener) -> Callable[[], None]:
+        """Attach ``listener`` and return a function that detaches it."""
+        with self._lock:
+            self._listeners += (listener,)
+        return lambda: self.remove_listener(listener)
+
+    def remove_listener(self, listener: Listener) -> None:
+        with self._lock:
+            listeners: List[Listener] = list(self._listeners)
+            if listener in listeners:
+                listeners.remove(listener)
+            self._listeners = tuple(listeners)
+
+    def emit(self, event: CommandEvent) -> None:
+        for listener in self._listeners:
+            try:
+                listener(event)
+            except Exception:
+                pass
+
+
+#: Instrumentation used by drivers that are not given their own.
+default = Instrumentation()
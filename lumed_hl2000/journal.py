@@ -0,0 +1,415 @@
+"""Append-only binary journal of commands and state transitions.
+
+:class:`Journal` records every command (with its reply, latency and retries)
+and every state change published by a :class:`~.state.StatePoller` as
+fixed-size binary records. Records are packed into a memory buffer and
+written in batches by a background thread, with an ``fsync`` at most every
+``fsync_interval`` seconds, so journaling costs a struct pack per command::
+
+    journal = Journal("session.hl2j").attach()
+    journal.watch_poller(poller)
+    ...
+    journal.close()
+
+:class:`JournalReader` memory-maps a journal and finds records by timestamp
+with a binary search over the mapped records; record timestamps never
+decrease, so the file itself is the index::
+
+    with JournalReader("session.hl2j") as journal:
+        for record in journal.between(start, end):
+            print(record)
+        print(journal.shutter_intervals())
+
+File layout: a header record, a table of :data:`NAME_SLOTS` resource names,
+then :data:`RECORD_SIZE`-byte records starting at :data:`DATA_OFFSET`. A
+record is ``<timestamp f64> <kind u8> <flags u8> <retries u8> <resource u8>
+<latency f32> <command 4s> <reply 20s>``, little-endian. The resource byte
+indexes the name table, whose slots are ``<used u8> <name 127s>`` and are
+filled in as lamps are first seen, so opening a journal reads the table
+instead of scanning the log. A record torn by a crash is dropped when the
+journal is reopened.
+"""
+
+import bisect
+import dataclasses
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+from . import instrumentation as _instrumentation
+from . import protocol
+from .errors import HL2000Error
+from .instrumentation import CommandEvent
+from .state import DeviceState, StatePoller
+
+MAGIC = b"HL2J"
+VERSION = 2
+
+_RECORD = struct.Struct("<dBBBBf4s20s")
+_HEADER = struct.Struct(f"<4sHH{_RECORD.size - 8}x")
+
+#: Size in bytes of every record, and of the header.
+RECORD_SIZE = _RECORD.size
+
+_NAME = struct.Struct("<B127s")
+
+#: Resource names a journal can hold; the record's resource field is one byte.
+NAME_SLOTS = 256
+
+#: File offset of the first record, after the header and the name table.
+DATA_OFFSET = RECORD_SIZE + NAME_SLOTS * _NAME.size
+
+KIND_COMMAND, KIND_STATE = 1, 2
+
+# Command record flags.
+_FAILED = 0x01
+_TRUNCATED = 0x02
+# State record flags.
+_SHUTTER_KNOWN, _SHUTTER_OPEN, _LAMP_KNOWN, _LAMP_ON, _DEGRADED = 0x01, 0x02, 0x04, 0x08, 0x10
+
+
+@dataclasses.dataclass(frozen=True)
+class JournalRecord:
+    """One decoded journal record.
+
+    Attributes:
+        timestamp: ``time.time()`` when the command completed or the state
+            was published.
+        kind: ``"command"`` or ``"state"``.
+        resource_name: Lamp the record belongs to.
+        command: Command token (command records).
+        reply: Reply, cut to 20 characters; None if none was received.
+        latency: Command round-trip time in seconds.
+        retries: Attempts repeated after a timeout or corrupted reply.
+        failed: The command raised.
+        shutter_open: Shutter position (state records), None if unknown.
+        lamp_on: Lamp power (state records), None if unknown.
+        degraded: The link was lost (state records).
+    """
+
+    timestamp: float
+    kind: str
+    resource_name: str
+    command: Optional[str] = None
+    reply: Optional[str] = None
+    latency: float = 0.0
+    retries: int = 0
+    failed: bool = False
+    shutter_open: Optional[bool] = None
+    lamp_on: Optional[bool] = None
+    degraded: bool = False
+
+
+def _pad(text: str, size: int) -> bytes:
+    return text.encode("ascii", "replace")[:size]
+
+
+class Journal:
+    """Write a binary journal, appending to ``path`` if it already exists.
+
+    Args:
+        path: Journal file.
+        flush_interval: Seconds between batched writes.
+        fsync_interval: Minimum seconds between ``fsync`` calls.
+        batch_size: Records buffered before a write is started early.
+
+    Raises:
+        HL2000Error: ``path`` exists, is not empty and is not a journal.
+    """
+
+    def __init__(
+        self, path: str, flush_interval: float = 0.5, fsync_interval: float = 5.0, batch_size: int = 1024
+    ) -> None:
+        self.path = path
+        self.flush_interval = flush_interval
+        self.fsync_interval = fsync_interval
+        self._batch_bytes = batch_size * RECORD_SIZE
+        self._lock = threading.Lock()
+        self._write_lock = threading.Lock()
+        self._buffer = bytearray()
+        # Name table slots to write before the buffered records.
+        self._names: List[Tuple[int, bytes]] = []
+        self._resource_ids: Dict[str, int] = {}
+        self._last_timestamp = 0.0
+        self._last_fsync = time.monotonic()
+        self._detach: List[Callable[[], None]] = []
+        self._file = self._open(path)
+        self._closed = False
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hl2000-journal", daemon=True)
+        self._thread.start()
+
+    def _open(self, path: str) -> BinaryIO:
+        if os.path.exists(path) and os.path.getsize(path) > 0:
+            # Raises for anything that is not a complete journal header and
+            # name table, so an existing file is never overwritten.
+            with JournalReader(path) as reader:
+                self._resource_ids = {name: i for i, name in reader.resource_names.items()}
+                if len(reader):
+                    self._last_timestamp = reader.timestamp(len(reader) - 1)
+                end = DATA_OFFSET + RECORD_SIZE * len(reader)
+            f = open(path, "r+b", buffering=0)
+            f.truncate(end)  # drop a record torn by a crash
+            f.seek(end)
+            return f
+        f = open(path, "wb", buffering=0)
+        f.write(_HEADER.pack(MAGIC, VERSION, RECORD_SIZE) + bytes(DATA_OFFSET - RECORD_SIZE))
+        return f
+
+    # ------------------------------------------------------------ recording
+
+    def attach(self, instrumentation: Optional[_instrumentation.Instrumentation] = None) -> "Journal":
+        """Record command events from ``instrumentation`` (default: all drivers)."""
+        source = _instrumentation.default if instrumentation is None else instrumentation
+        self._detach.append(source.add_listener(self.record_command))
+        return self
+
+    def watch_poller(self, poller: StatePoller, resource_name: Optional[str] = None) -> None:
+        """Record every state change published by ``poller``.
+
+        ``resource_name`` labels the records; defaults to the name of the
+        poller's driver once it is open.
+        """
+
+        def on_state(state: DeviceState) -> None:
+            driver = poller.worker.driver
+            self.record_state(state, resource_name or (driver.resource_name if driver is not None else ""))
+
+        self._detach.append(poller.subscribe(on_state))
+
+    def record_command(self, event: CommandEvent) -> None:
+        """Append one command; suitable as an instrumentation listener."""
+        reply = event.reply
+        flags = 0 if event.error is None else _FAILED
+        if reply is not None and len(reply) > 20:
+            flags |= _TRUNCATED
+        self._append(
+            event.resource_name,
+            event.timestamp + event.latency,
+            KIND_COMMAND,
+            flags,
+            min(event.retries, 255),
+            event.latency,
+            _pad(event.command, 4),
+            b"" if reply is None else _pad(reply, 20),
+        )
+
+    def record_state(self, state: DeviceState, resource_name: str = "") -> None:
+        """Append one state transition."""
+        flags = _DEGRADED if state.degraded else 0
+        if state.shutter_open is not None:
+            flags |= _SHUTTER_KNOWN | (_SHUTTER_OPEN if state.shutter_open else 0)
+        if state.lamp_on is not None:
+            flags |= _LAMP_KNOWN | (_LAMP_ON if state.lamp_on else 0)
+        self._append(resource_name, time.time(), KIND_STATE, flags, 0, 0.0, b"", b"")
+
+    def _append(
+        self,
+        resource_name: str,
+        timestamp: float,
+        kind: int,
+        flags: int,
+        retries: int,
+        latency: float,
+        command: bytes,
+        reply: bytes,
+    ) -> None:
+        with self._lock:
+            if self._closed:
+                return
+            resource = self._resource_ids.get(resource_name)
+            if resource is None:
+                resource = self._register(resource_name)
+            # Never decrease, so readers can binary-search by timestamp.
+            timestamp = self._last_timestamp = max(timestamp, self._last_timestamp)
+            self._buffer += _RECORD.pack(timestamp, kind, flags, retries, resource, latency, command, reply)
+            full = len(self._buffer) >= self._batch_bytes
+        if full:
+            self._wake.set()
+
+    def _register(self, resource_name: str) -> int:
+        resource = len(self._resource_ids)
+        if resource >= NAME_SLOTS:
+            raise HL2000Error(f"journal holds at most {NAME_SLOTS} resource names")
+        self._resource_ids[resource_name] = resource
+        self._names.append((resource, _NAME.pack(1, resource_name.encode("utf-8"))))
+        return resource
+
+    # -------------------------------------------------------------- writing
+
+    def flush(self, fsync: bool = False) -> None:
+        """Write buffered records now; ``fsync`` also forces them to disk."""
+        with self._write_lock:
+            with self._lock:
+                data, self._buffer = self._buffer, bytearray()
+                names, self._names = self._names, []
+            if names:
+                # Names first, so no written record refers to an empty slot.
+                end = self._file.tell()
+                for resource, slot in names:
+                    self._file.seek(RECORD_SIZE + resource * _NAME.size)
+                    self._file.write(slot)
+                self._file.seek(end)
+            if data:
+                self._file.write(data)
+            now = time.monotonic()
+            if fsync or (data and now - self._last_fsync >= self.fsync_interval):
+                os.fsync(self._file.fileno())
+                self._last_fsync = now
+
+    def _run(self) -> None:
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+            except (OSError, ValueError):
+                pass
+
+    def close(self) -> None:
+        """Detach from every source, write and fsync what is buffered, close the file."""
+        for detach in self._detach:
+            detach()
+        self._detach.clear()
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._wake.set()
+        self._thread.join()
+        self.flush(fsync=True)
+        self._file.close()
+
+    def __enter__(self) -> "Journal":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
+
+
+class _Timestamps(Sequence[float]):
+    """Record timestamps of a mapped journal, read on demand for :mod:`bisect`."""
+
+    def __init__(self, reader: "JournalReader") -> None:
+        self._reader = reader
+
+    def __len__(self) -> int:
+        return len(self._reader)
+
+    def __getitem__(self, index: Any) -> Any:
+        return self._reader.timestamp(index)
+
+
+class JournalReader:
+    """Memory-mapped, read-only view of a journal.
+
+    Only records complete when the reader was opened are visible; reopen it
+    to see records written since.
+
+    Raises:
+        HL2000Error: ``path`` is not a journal of this version.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        with open(path, "rb") as f:
+            header = f.read(RECORD_SIZE)
+            if len(header) < _HEADER.size or header[:4] != MAGIC:
+                raise HL2000Error(f"{path}: not an HL2000 journal")
+            magic, version, record_size = _HEADER.unpack(header)
+            if version != VERSION or record_size != RECORD_SIZE:
+                raise HL2000Error(f"{path}: not an HL2000 journal (version {VERSION})")
+            if os.fstat(f.fileno()).st_size < DATA_OFFSET:
+                raise HL2000Error(f"{path}: torn journal header")
+            self._map = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        self._count = (len(self._map) - DATA_OFFSET) // RECORD_SIZE
+        #: Resource names by the id stored in records.
+        self.resource_names: Dict[int, str] = {}
+        for resource, (used, name) in enumerate(_NAME.iter_unpack(self._map[RECORD_SIZE:DATA_OFFSET])):
+            if used:
+                self.resource_names[resource] = name.rstrip(b"\0").decode("utf-8", "replace")
+
+    def __len__(self) -> int:
+        return self._count
+
+    def timestamp(self, index: int) -> float:
+        """Timestamp of record ``index`` without decoding the rest of it."""
+        if not 0 <= index < self._count:
+            raise IndexError(index)
+        return struct.unpack_from("<d", self._map, DATA_OFFSET + RECORD_SIZE * index)[0]
+
+    def _decode(self, index: int) -> Optional[JournalRecord]:
+        timestamp, kind, flags, retries, resource, latency, command, reply = _RECORD.unpack_from(
+            self._map, DATA_OFFSET + RECORD_SIZE * index
+        )
+        name = self.resource_names.get(resource, "")
+        if kind == KIND_COMMAND:
+            token = command.rstrip(b"\0").decode("ascii")
+            text = reply.rstrip(b"\0").decode("ascii")
+            return JournalRecord(
+                timestamp,
+                "command",
+                name,
+                command=token,
+                reply=text if text or not flags & _FAILED else None,
+                latency=latency,
+                retries=retries,
+                failed=bool(flags & _FAILED),
+            )
+        if kind == KIND_STATE:
+            return JournalRecord(
+                timestamp,
+                "state",
+                name,
+                shutter_open=bool(flags & _SHUTTER_OPEN) if flags & _SHUTTER_KNOWN else None,
+                lamp_on=bool(flags & _LAMP_ON) if flags & _LAMP_KNOWN else None,
+                degraded=bool(flags & _DEGRADED),
+            )
+        return None
+
+    def records(self, start: int = 0, stop: Optional[int] = None) -> Iterator[JournalRecord]:
+        """Yield command and state records with indexes in ``[start, stop)``."""
+        for index in range(start, self._count if stop is None else min(stop, self._count)):
+            record = self._decode(index)
+            if record is not None:
+                yield record
+
+    def __iter__(self) -> Iterator[JournalRecord]:
+        return self.records()
+
+    def between(self, start: float, end: float) -> Iterator[JournalRecord]:
+        """Yield the records with ``start <= timestamp < end``, located by binary search."""
+        timestamps = _Timestamps(self)
+        return self.records(bisect.bisect_left(timestamps, start), bisect.bisect_left(timestamps, end))
+
+    def shutter_intervals(self, resource_name: Optional[str] = None) -> List[Tuple[str, float, Optional[float]]]:
+        """Return ``(resource, opened, closed)`` for every acknowledged shutter opening.
+
+        ``closed`` is None if the shutter was still open at the end of the
+        journal. Only commands the lamp acknowledged count.
+        """
+        intervals: List[Tuple[str, float, Optional[float]]] = []
+        opened: Dict[str, float] = {}
+        for record in self:
+            if record.kind != "command" or record.failed or record.reply != protocol.ACK:
+                continue
+            if resource_name is not None and record.resource_name != resource_name:
+                continue
+            if record.command == protocol.SHUTTER_OPEN:
+                opened.setdefault(record.resource_name, record.timestamp)
+            elif record.command == protocol.SHUTTER_CLOSE and record.resource_name in opened:
+                intervals.append((record.resource_name, opened.pop(record.resource_name), record.timestamp))
+        intervals.extend((name, since, None) for name, since in opened.items())
+        return intervals
+
+    def close(self) -> None:
+        self._map.close()
+
+    def __enter__(self) -> "JournalReader":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
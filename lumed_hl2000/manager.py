@@ -0,0 +1,170 @@
+"""Several lamps sharing one pyvisa ResourceManager.
+
+Each lamp gets its own :class:`~.worker.IOWorker`, so lamps are opened in
+parallel and broadcast operations run concurrently across serial ports: the
+wall time of a broadcast is that of the slowest lamp, not the sum.
+"""
+
+import dataclasses
+import time
+from concurrent.futures import Future
+from concurrent.futures import wait as wait_futures
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Tuple
+
+from .driver import HL2000
+from .worker import IOWorker
+
+if TYPE_CHECKING:
+    import pyvisa
+
+
+@dataclasses.dataclass(frozen=True)
+class CloseAllReport:
+    """Outcome of :meth:`LampManager.close_all_shutters`.
+
+    Attributes:
+        acknowledged: Lamps that acknowledged the close command.
+        failed: Lamps that answered with an error, with the exception raised.
+        timed_out: Lamps that did not answer before the deadline.
+        elapsed: Wall time of the broadcast in seconds.
+    """
+
+    acknowledged: Tuple[str, ...]
+    failed: Dict[str, BaseException]
+    timed_out: Tuple[str, ...]
+    elapsed: float
+
+    @property
+    def all_closed(self) -> bool:
+        return not self.failed and not self.timed_out
+
+
+class LampManager:
+    """Open and drive a set of lamps through one ResourceManager.
+
+    Args:
+        resource_manager: Shared ResourceManager. If omitted, one is created
+            on first use and closed by :meth:`close`.
+    """
+
+    def __init__(self, resource_manager: Optional["pyvisa.ResourceManager"] = None) -> None:
+        self._resource_manager = resource_manager
+        self._owns_resource_manager = resource_manager is None
+        self._workers: Dict[str, IOWorker] = {}
+
+    @property
+    def resource_manager(self) -> "pyvisa.ResourceManager":
+        if self._resource_manager is None:
+            import pyvisa
+
+            self._resource_manager = pyvisa.ResourceManager()
+        return self._resource_manager
+
+    def add(self, resource_name: str, name: Optional[str] = None, **open_kwargs: Any) -> IOWorker:
+        """Open a lamp in the background and return its worker.
+
+        Adding a name that is already managed returns the existing worker, so
+        every resource is opened only once.
+
+        Args:
+            resource_name: VISA resource name of the lamp.
+            name: Label used to address the lamp; defaults to ``resource_name``.
+            **open_kwargs: Passed to :meth:`HL2000.open`.
+        """
+        name = resource_name if name is None else name
+        if name in self._workers:
+            return self._workers[name]
+        resource_manager = self.resource_manager
+        worker = IOWorker(
+            lambda: HL2000.open(resource_name, resource_manager, **open_kwargs),
+            name=f"hl2000-io[{name}]",
+        ).start()
+        self._workers[name] = worker
+        return worker
+
+    def remove(self, name: str) -> None:
+        """Stop the lamp's worker and forget it."""
+        self._workers.pop(name).stop()
+
+    def __getitem__(self, name: str) -> IOWorker:
+        return self._workers[name]
+
+    def __contains__(self, name: object) -> bool:
+        return name in self._workers
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._workers)
+
+    def __len__(self) -> int:
+        return len(self._workers)
+
+    @property
+    def names(self) -> List[str]:
+        return list(self._workers)
+
+    def broadcast(self, method: str, *args: Any) -> Dict[str, "Future[Any]"]:
+        """Queue ``driver.<method>(*args)`` on every lamp at once."""
+        return {name: worker.submit(method, *args) for name, worker in self._workers.items()}
+
+    def broadcast_wait(self, method: str, *args: Any, timeout: Optional[float] = None) -> Dict[str, Any]:
+        """Run ``method`` on every lamp concurrently and collect the outcomes.
+
+        Returns:
+            ``{name: result}``; a lamp that failed maps to the raised exception
+            and one that did not answer within ``timeout`` to a
+            :class:`TimeoutError`.
+        """
+        futures = self.broadcast(method, *args)
+        wait_futures(futures.values(), timeout)
+        outcomes: Dict[str, Any] = {}
+        for name, future in futures.items():
+            if not future.done():
+                outcomes[name] = TimeoutError(f"{name} did not answer {method!r} in time")
+            elif future.exception() is not None:
+                outcomes[name] = future.exception()
+            else:
+                outcomes[name] = future.result()
+        return outcomes
+
+    def close_all_shutters(self, deadline: float = 0.5) -> CloseAllReport:
+        """Close every shutter in parallel and report who acknowledged in time.
+
+        The close command jumps ahead of anything queued on each lamp, and a
+        shutter sequence being played is aborted first. The call returns after
+        at most ``deadline`` seconds, whether or not every lamp answered; a
+        late lamp still receives its close command.
+        """
+        start = time.monotonic()
+        futures: Dict[str, "Future[Any]"] = {}
+        for name, worker in self._workers.items():
+            driver = worker.driver
+            if driver is not None:
+                driver.abort_sequence()
+            futures[name] = worker.submit("close_shutter", urgent=True)
+        wait_futures(futures.values(), deadline)
+        acknowledged: List[str] = []
+        failed: Dict[str, BaseException] = {}
+        timed_out: List[str] = []
+        for name, future in futures.items():
+            if not future.done():
+                timed_out.append(name)
+            elif future.exception() is not None:
+                failed[name] = future.exception()  # type: ignore[assignment]
+            else:
+                acknowledged.append(name)
+        return CloseAllReport(tuple(acknowledged), failed, tuple(timed_out), time.monotonic() - start)
+
+    def close(self) -> None:
+        """Stop every worker, then close the ResourceManager if it is ours."""
+        workers, self._workers = list(self._workers.values()), {}
+        for worker in workers:
+            worker.stop()
+        if self._owns_resource_manager and self._resource_manager is not None:
+            self._resource_manager.close()
+            self._resource_manager = None
+
+    def __enter__(self) -> "LampManager":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.close()
@@ -0,0 +1,245 @@
+"""Prometheus metrics for lamp usage and serial link health.
+
+:class:`MetricsExporter` listens to the driver instrumentation (and
+optionally to workers for link state) and renders the Prometheus text
+exposition format. It can serve it over HTTP for scraping or write it to a
+file for the node_exporter textfile collector::
+
+    exporter = MetricsExporter().attach()
+    exporter.watch_worker(worker)
+    exporter.serve(9500)                 # http://127.0.0.1:9500/metrics
+    # or: exporter.write_textfile("/var/lib/node_exporter/hl2000.prom")
+
+No third-party Prometheus client is required.
+"""
+
+import bisect
+import os
+import threading
+import time
+from collections import defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, DefaultDict, Dict, List, Optional, Sequence, Tuple
+
+from . import instrumentation as _instrumentation
+from . import protocol
+from .instrumentation import CommandEvent
+from .worker import IOWorker
+
+#: Upper bounds of the command latency histogram buckets, in seconds.
+LATENCY_BUCKETS: Tuple[float, ...] = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+
+Labels = Tuple[Tuple[str, str], ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(labels: Labels) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{_escape(value)}"' for key, value in labels) + "}"
+
+
+class _Histogram:
+    __slots__ = ("counts", "total", "count")
+
+    def __init__(self, buckets: int) -> None:
+        self.counts = [0] * buckets
+        self.total = 0.0
+        self.count = 0
+
+
+class MetricsExporter:
+    """Collect lamp metrics from command events and link changes.
+
+    Args:
+        buckets: Latency histogram bucket bounds in seconds.
+    """
+
+    def __init__(self, buckets: Sequence[float] = LATENCY_BUCKETS) -> None:
+        self._buckets = tuple(sorted(buckets))
+        self._lock = threading.Lock()
+        self._commands: DefaultDict[Labels, int] = defaultdict(int)
+        self._bytes: DefaultDict[Labels, int] = defaultdict(int)
+        self._retries: DefaultDict[str, int] = defaultdict(int)
+        self._latency: Dict[str, _Histogram] = {}
+        self._reconnects: DefaultDict[str, int] = defaultdict(int)
+        self._link_up: Dict[str, int] = {}
+        self._shutter_cycles: DefaultDict[str, int] = defaultdict(int)
+        self._shutter_open: Dict[str, bool] = {}
+        self._lamp_on_seconds: DefaultDict[str, float] = defaultdict(float)
+        self._lamp_on_since: Dict[str, Optional[float]] = {}
+        self._detach: List[Callable[[], None]] = []
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    # ------------------------------------------------------------ collection
+
+    def attach(self, instrumentation: Optional[_instrumentation.Instrumentation] = None) -> "MetricsExporter":
+        """Start receiving command events from ``instrumentation`` (default: all drivers)."""
+        source = _instrumentation.default if instrumentation is None else instrumentation
+        self._detach.append(source.add_listener(self.record))
+        return self
+
+    def watch_worker(self, worker: IOWorker, resource_name: Optional[str] = None) -> None:
+        """Count reconnects and track link state of ``worker``.
+
+        ``resource_name`` labels the series; defaults to the name of the
+        worker's driver once it is open.
+        """
+
+        def on_link_change(degraded: bool) -> None:
+            driver = worker.driver
+            name = resource_name or (driver.resource_name if driver is not None else "")
+            with self._lock:
+                self._link_up[name] = 0 if degraded else 1
+                if not degraded:
+                    self._reconnects[name] += 1
+
+        worker.add_link_listener(on_link_change)
+
+    def record(self, event: CommandEvent) -> None:
+        """Account for one command; suitable as an instrumentation listener."""
+        resource = event.resource_name
+        outcome = "ok" if event.error is None else type(event.error).__name__
+        with self._lock:
+            self._commands[(("resource", resource), ("command", event.command), ("outcome", outcome))] += 1
+            self._bytes[(("resource", resource), ("direction", "sent"))] += event.bytes_sent
+            self._bytes[(("resource", resource), ("direction", "received"))] += event.bytes_received
+            self._retries[resource] += event.retries
+            histogram = self._latency.get(resource)
+            if histogram is None:
+                histogram = self._latency[resource] = _Histogram(len(self._buckets))
+            index = bisect.bisect_left(self._buckets, event.latency)
+            if index < len(self._buckets):
+                histogram.counts[index] += 1
+            histogram.total += event.latency
+            histogram.count += 1
+            self._link_up.setdefault(resource, 1)
+            if event.error is None:
+                self._update_device_state(resource, event)
+
+    def _update_device_state(self, resource: str, event: CommandEvent) -> None:
+        command, reply = event.command, event.reply
+        shutter: Optional[bool] = None
+        lamp: Optional[bool] = None
+        if command in (protocol.SHUTTER_OPEN, protocol.SHUTTER_CLOSE):
+            shutter = command == protocol.SHUTTER_OPEN
+        elif command == protocol.QUERY_SHUTTER and reply in ("0", "1"):
+            shutter = reply == "1"
+        elif command in (protocol.LAMP_ON, protocol.LAMP_OFF):
+            lamp = command == protocol.LAMP_ON
+        elif command == protocol.QUERY_LAMP and reply in ("0", "1"):
+            lamp = reply == "1"
+        if shutter is not None:
+            if shutter and not self._shutter_open.get(resource, False):
+                self._shutter_cycles[resource] += 1
+            self._shutter_open[resource] = shutter
+        if lamp is not None:
+            now = event.timestamp + event.latency
+            since = self._lamp_on_since.get(resource)
+            if since is not None:
+                self._lamp_on_seconds[resource] += now - since
+            self._lamp_on_since[resource] = now if lamp else None
+
+    # ------------------------------------------------------------- rendering
+
+    def render(self) -> str:
+        """Return every metric in the Prometheus text exposition format."""
+        lines: List[str] = []
+
+        def family(name: str, kind: str, help_text: str, samples: List[Tuple[str, Labels, float]]) -> None:
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for suffix, labels, value in samples:
+                lines.append(f"{name}{suffix}{_format_labels(labels)} {value:g}")
+
+        now = time.time()
+        with self._lock:
+            family(
+                "hl2000_commands_total", "counter", "Commands sent to the lamp, by outcome.",
+                [("", labels, n) for labels, n in sorted(self._commands.items())],
+            )
+            family(
+                "hl2000_serial_bytes_total", "counter", "Bytes exchanged over the serial link.",
+                [("", labels, n) for labels, n in sorted(self._bytes.items())],
+            )
+            family(
+                "hl2000_command_retries_total", "counter", "Command attempts repeated after a timeout.",
+                [("", (("resource", r),), n) for r, n in sorted(self._retries.items())],
+            )
+            latency: List[Tuple[str, Labels, float]] = []
+            for resource, histogram in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip(self._buckets, histogram.counts):
+                    cumulative += count
+                    latency.append(("_bucket", (("resource", resource), ("le", f"{bound:g}")), cumulative))
+                latency.append(("_bucket", (("resource", resource), ("le", "+Inf")), histogram.count))
+                latency.append(("_sum", (("resource", resource),), histogram.total))
+                latency.append(("_count", (("resource", resource),), histogram.count))
+            family("hl2000_command_latency_seconds", "histogram", "Command round-trip time.", latency)
+            family(
+                "hl2000_reconnects_total", "counter", "Serial link recoveries after a loss.",
+                [("", (("resource", r),), n) for r, n in sorted(self._reconnects.items())],
+            )
+            family(
+                "hl2000_link_up", "gauge", "1 if the serial link is up, 0 while reconnecting.",
+                [("", (("resource", r),), n) for r, n in sorted(self._link_up.items())],
+            )
+            family(
+                "hl2000_shutter_cycles_total", "counter", "Shutter openings.",
+                [("", (("resource", r),), n) for r, n in sorted(self._shutter_cycles.items())],
+            )
+            lamp_on: Dict[str, float] = dict(self._lamp_on_seconds)
+            for resource, since in self._lamp_on_since.items():
+                if since is not None:
+                    lamp_on[resource] = lamp_on.get(resource, 0.0) + now - since
+            family(
+                "hl2000_lamp_on_seconds_total", "counter", "Time the lamp was on while observed.",
+                [("", (("resource", r),), v) for r, v in sorted(lamp_on.items())],
+            )
+        return "\n".join(lines) + "\n"
+
+    # -------------------------------------------------------------- exporting
+
+    def write_textfile(self, path: str) -> None:
+        """Write the metrics to ``path`` atomically (textfile collector format)."""
+        tmp = f"{path}.{os.getpid()}.tmp"
+        with open(tmp, "w") as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+    def serve(self, port: int = 9500, address: str = "127.0.0.1") -> Tuple[str, int]:
+        """Serve ``/metrics`` over HTTP from a daemon thread; returns the bound address."""
+        exporter = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                if self.path.split("?")[0] != "/metrics":
+                    self.send_error(404)
+                    return
+                body = exporter.render().encode()
+                self.send_response(200)
+                self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+                self.send_header("Content-Length", str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format: str, *args: object) -> None:
+                pass
+
+        self._server = ThreadingHTTPServer((address, port), Handler)
+        self._server.daemon_threads = True
+        threading.Thread(target=self._server.serve_forever, name="hl2000-metrics", daemon=True).start()
+        return self._server.server_address[:2]
+
+    def close(self) -> None:
+        """Stop the HTTP server and detach from instrumentation."""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+        for detach in self._detach:
+            detach()
+        self._detach.clear()
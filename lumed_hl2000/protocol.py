@@ -0,0 +1,122 @@
+"""RS-232 command set of the HL-2000-HP-232R.
+
+Every string exchanged with the lamp is defined here so that the rest of the
+package never spells out a command literal. Commands are short ASCII tokens
+terminated by a carriage return; the lamp answers every command with a single
+terminated line, either ``OK``, a value, or an ``E<code>`` error reply.
+
+:data:`COMMANDS` describes the command set declaratively, and every command
+is encoded once, at import, into the exact bytes written to the port
+(:data:`FRAMES`), so the driver's hot path never formats or encodes strings.
+"""
+
+import dataclasses
+import functools
+from typing import Dict
+
+BAUD_RATE = 9600
+DATA_BITS = 8
+TERMINATION = "\r"
+DEFAULT_TIMEOUT_MS = 500
+
+SHUTTER_OPEN = "S1"
+SHUTTER_CLOSE = "S0"
+LAMP_ON = "L1"
+LAMP_OFF = "L0"
+
+QUERY_SHUTTER = "S?"
+QUERY_LAMP = "L?"
+QUERY_IDENTITY = "V?"
+
+#: Every identity reply starts with this model string.
+IDENTITY_PREFIX = "HL-2000-HP-232R"
+
+ACK = "OK"
+ERROR_PREFIX = "E"
+
+# Kinds of reply a command expects.
+REPLY_ACK = "ack"
+REPLY_FLAG = "flag"
+REPLY_TEXT = "text"
+
+
+@dataclasses.dataclass(frozen=True)
+class Command:
+    """One entry of the command table.
+
+    Attributes:
+        token: Command text without terminator.
+        reply: Expected reply kind: ``REPLY_ACK``, ``REPLY_FLAG`` or
+            ``REPLY_TEXT``.
+        description: Human-readable meaning.
+        frame: ``token`` plus terminator, encoded, ready for ``write_raw``.
+    """
+
+    token: str
+    reply: str
+    description: str
+    frame: bytes = dataclasses.field(init=False, repr=False)
+
+    def __post_init__(self) -> None:
+        object.__setattr__(self, "frame", (self.token + TERMINATION).encode("ascii"))
+
+
+COMMANDS: Dict[str, Command] = {
+    command.token: command
+    for command in (
+        Command(SHUTTER_OPEN, REPLY_ACK, "open the shutter"),
+        Command(SHUTTER_CLOSE, REPLY_ACK, "close the shutter"),
+        Command(LAMP_ON, REPLY_ACK, "switch the lamp on"),
+        Command(LAMP_OFF, REPLY_ACK, "switch the lamp off"),
+        Command(QUERY_SHUTTER, REPLY_FLAG, "1 if the shutter is open"),
+        Command(QUERY_LAMP, REPLY_FLAG, "1 if the lamp is on"),
+        Command(QUERY_IDENTITY, REPLY_TEXT, "model and firmware identity"),
+    )
+}
+
+#: Precompiled frame of every command, by token.
+FRAMES: Dict[str, bytes] = {token: command.frame for token, command in COMMANDS.items()}
+
+#: Status fields readable from the lamp, mapped to the query returning each.
+STATUS_QUERIES: Dict[str, str] = {"shutter_open": QUERY_SHUTTER, "lamp_on": QUERY_LAMP}
+
+
+@functools.lru_cache(maxsize=None)
+def encode(*tokens: str) -> bytes:
+    """Return the bytes sending ``tokens`` back to back, cached per combination."""
+    return b"".join(FRAMES.get(token) or (token + TERMINATION).encode("ascii") for token in tokens)
+
+
+def is_error(reply: str) -> bool:
+    """Return True if ``reply`` is an error reply from the lamp."""
+    return reply.startswith(ERROR_PREFIX)
+
+
+def reply_matches(token: str, reply: str) -> bool:
+    """Return True if ``reply`` is a possible answer to command ``token``.
+
+    Error replies answer any command; otherwise the reply must have the kind
+    the command table declares. A mismatch means the replies are out of step
+    with the commands.
+    """
+    command = COMMANDS.get(token)
+    if command is None or is_error(reply):
+        return True
+    if command.reply == REPLY_ACK:
+        return reply == ACK
+    if command.reply == REPLY_FLAG:
+        return reply in ("0", "1")
+    return True
+
+
+def parse_flag(reply: str) -> bool:
+    """Parse a ``0``/``1`` query reply into a bool.
+
+    Raises:
+        ValueError: ``reply`` is neither ``0`` nor ``1``.
+    """
+    if reply == "1":
+        return True
+    if reply == "0":
+        return False
+    raise ValueError(f"expected '0' or '1', got {reply!r}")
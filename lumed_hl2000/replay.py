@@ -0,0 +1,261 @@
+"""Replay a recorded session against the simulated lamp.
+
+A session is recorded with :class:`~.journal.Journal`, which keeps every
+command, its reply and its timing. :func:`load` reads the command stream back
+and :func:`replay` sends it, in order and from a single thread, to
+:class:`~.sim.SimulatedResource` lamps named like the recorded ones, either
+at the original pace (optionally sped up) or as fast as possible::
+
+    commands = load("production.hl2j")
+    result = replay(commands, speed=1.0)     # original inter-command timing
+    result = replay(commands, speed=None)    # as fast as possible
+    print(result.max_lateness, result.mismatches)
+
+Replays are deterministic: each simulated lamp starts in the state the
+recording implies and answers the identity query with the recorded identity,
+error replies seen in production are injected at the same commands, and every
+other recorded reply is compared with the replayed one. Identity queries that
+got no reply are failed auto-detection probes of other ports and are not
+replayed; other commands that got none are replayed without comparing.
+
+Run from the command line with::
+
+    python -m lumed_hl2000.replay production.hl2j [--fast | --speed 2]
+"""
+
+import argparse
+import dataclasses
+import sys
+import time
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+from . import protocol
+from .driver import HL2000
+from .journal import JournalReader
+from .sequence import SPIN_MARGIN
+from .sim import SimulatedResourceManager
+from .timeouts import percentile
+
+
+@dataclasses.dataclass(frozen=True)
+class RecordedCommand:
+    """One command of a recorded session.
+
+    Attributes:
+        offset: Seconds from the first recorded command to when this one was
+            issued.
+        resource_name: Lamp it was sent to.
+        command: Command token.
+        reply: Recorded reply (cut to the journal's 20 characters), None if
+            none was received.
+    """
+
+    offset: float
+    resource_name: str
+    command: str
+    reply: Optional[str]
+
+
+@dataclasses.dataclass(frozen=True)
+class ReplayResult:
+    """Outcome of :func:`replay`.
+
+    Attributes:
+        latencies: Round-trip time of every replayed command, in seconds.
+        lateness: How late each command was issued against its schedule
+            (all zero when replaying as fast as possible).
+        mismatches: ``(index, command, recorded reply, replayed reply)`` for
+            every command whose reply differed from the recording.
+        elapsed: Wall time of the whole replay.
+        unanswered: Commands recorded without a reply (a timeout or a lost
+            link); they are replayed but their replies are not compared.
+    """
+
+    latencies: Tuple[float, ...]
+    lateness: Tuple[float, ...]
+    mismatches: Tuple[Tuple[int, str, Optional[str], Optional[str]], ...]
+    elapsed: float
+    unanswered: int = 0
+
+    @property
+    def max_lateness(self) -> float:
+        return max(self.lateness, default=0.0)
+
+
+def load(
+    path: str, resource_name: Optional[str] = None, start: Optional[float] = None, end: Optional[float] = None
+) -> List[RecordedCommand]:
+    """Read the commands recorded in the journal at ``path``.
+
+    Failed discovery probes (identity queries without a reply) are skipped.
+
+    Args:
+        resource_name: Keep only this lamp's commands.
+        start: Keep commands completed at or after this ``time.time()``.
+        end: Keep commands completed before this ``time.time()``.
+    """
+    commands: List[RecordedCommand] = []
+    with JournalReader(path) as journal:
+        records = journal.between(start if start is not None else float("-inf"), end if end is not None else float("inf"))
+        issued: List[Tuple[float, Any]] = [
+            (record.timestamp - record.latency, record)
+            for record in records
+            if record.kind == "command"
+            and (resource_name is None or record.resource_name == resource_name)
+            and not (record.command == protocol.QUERY_IDENTITY and record.reply is None)
+        ]
+    if not issued:
+        return commands
+    first = min(at for at, _ in issued)
+    for at, record in issued:
+        commands.append(RecordedCommand(at - first, record.resource_name, record.command, record.reply))
+    return commands
+
+
+def _initial_state(commands: Sequence[RecordedCommand], resource_name: str) -> Dict[str, Any]:
+    """Shutter and lamp state the recording implies before its first command, and the lamp's identity."""
+    setters = {
+        protocol.SHUTTER_OPEN: "shutter_open",
+        protocol.SHUTTER_CLOSE: "shutter_open",
+        protocol.LAMP_ON: "lamp_on",
+        protocol.LAMP_OFF: "lamp_on",
+    }
+    queries = {protocol.QUERY_SHUTTER: "shutter_open", protocol.QUERY_LAMP: "lamp_on"}
+    state: Dict[str, Any] = {}
+    settled = set()
+    for recorded in commands:
+        if recorded.resource_name != resource_name:
+            continue
+        if (
+            recorded.command == protocol.QUERY_IDENTITY
+            and "identity" not in state
+            and recorded.reply is not None
+            and not protocol.is_error(recorded.reply)
+        ):
+            state["identity"] = recorded.reply
+        if recorded.command in setters:
+            settled.add(setters[recorded.command])
+        field = queries.get(recorded.command)
+        if field is not None and field not in settled and recorded.reply in ("0", "1"):
+            state[field] = recorded.reply == "1"
+            settled.add(field)
+    return state
+
+
+def replay(
+    commands: Sequence[RecordedCommand],
+    speed: Optional[float] = 1.0,
+    resource_manager: Optional[Any] = None,
+    reproduce_errors: bool = True,
+    **sim_options: Any,
+) -> ReplayResult:
+    """Send ``commands`` to simulated lamps and compare their replies with the recording.
+
+    Args:
+        speed: Replay pace relative to the recording (2.0 halves every
+            interval); None sends each command as soon as the previous one
+            is answered.
+        resource_manager: Opens the lamps; defaults to a
+            :class:`~.sim.SimulatedResourceManager` with ``sim_options``.
+        reproduce_errors: Inject recorded error replies into the simulator so
+            the replayed session fails where the recorded one did.
+    """
+    names = tuple(dict.fromkeys(recorded.resource_name for recorded in commands))
+    if resource_manager is None:
+        sim_options.setdefault("seed", 0)
+        resource_manager = SimulatedResourceManager(names, **sim_options)
+    drivers: Dict[str, HL2000] = {}
+    latencies: List[float] = []
+    lateness: List[float] = []
+    mismatches: List[Tuple[int, str, Optional[str], Optional[str]]] = []
+    unanswered = 0
+    clock = time.perf_counter
+    try:
+        for name in names:
+            driver = drivers[name] = HL2000.open(name, resource_manager)
+            for field, value in _initial_state(commands, name).items():
+                if hasattr(driver.resource, field):
+                    setattr(driver.resource, field, value)
+        t0 = clock()
+        for index, recorded in enumerate(commands):
+            driver = drivers[recorded.resource_name]
+            if speed is not None:
+                deadline = t0 + recorded.offset / speed
+                remaining = deadline - clock() - SPIN_MARGIN
+                if remaining > 0:
+                    time.sleep(remaining)
+                while clock() < deadline:
+                    pass
+                lateness.append(clock() - deadline)
+            if reproduce_errors and recorded.reply is not None and protocol.is_error(recorded.reply):
+                inject = getattr(driver.resource, "inject_error", None)
+                if inject is not None:
+                    inject(recorded.reply)
+            reply, error = None, None
+            issued = clock()
+            try:
+                with driver.exclusive():
+                    driver.write_frame(protocol.encode(recorded.command))
+                    reply = driver.read_reply()
+            except Exception as exc:
+                error = exc
+            latency = clock() - issued
+            if reply is not None:
+                reply = reply.strip()
+            if driver.instrumentation.active:
+                driver.report_command(recorded.command, reply, latency, 0, error)
+            latencies.append(latency)
+            if recorded.reply is None:
+                # The simulator always answers; nothing to compare with.
+                unanswered += 1
+            elif (reply[:20] if reply is not None else None) != recorded.reply:
+                mismatches.append((index, recorded.command, recorded.reply, reply))
+        elapsed = clock() - t0
+    finally:
+        for driver in drivers.values():
+            driver.close()
+    return ReplayResult(tuple(latencies), tuple(lateness), tuple(mismatches), elapsed, unanswered)
+
+
+def format_summary(result: ReplayResult) -> str:
+    lines = [f"{len(result.latencies)} commands in {result.elapsed:.3f} s"]
+    if result.latencies:
+        lines.append(
+            "latency p50 {:.3f} ms, p95 {:.3f} ms, p99 {:.3f} ms".format(
+                *(percentile(result.latencies, q) * 1e3 for q in (50, 95, 99))
+            )
+        )
+    if result.lateness:
+        lines.append(f"max lateness {result.max_lateness * 1e3:.3f} ms")
+    if result.unanswered:
+        lines.append(f"{result.unanswered} commands unanswered in the recording, not compared")
+    lines.append(f"{len(result.mismatches)} reply mismatches")
+    for index, command, recorded, replayed in result.mismatches[:20]:
+        lines.append(f"  #{index} {command}: recorded {recorded!r}, replayed {replayed!r}")
+    return "\n".join(lines)
+
+
+def main(argv: Sequence[str] = ()) -> int:
+    parser = argparse.ArgumentParser(prog="python -m lumed_hl2000.replay", description=__doc__.splitlines()[0])
+    parser.add_argument("journal", help="journal recorded with lumed_hl2000.journal")
+    parser.add_argument("-r", "--resource", help="replay only this lamp")
+    pace = parser.add_mutually_exclusive_group()
+    pace.add_argument("--speed", type=float, default=1.0, help="pace relative to the recording (default: 1)")
+    pace.add_argument("--fast", action="store_true", help="send commands as fast as possible")
+    parser.add_argument("--no-realtime", dest="realtime", action="store_false", help="disable the serial timing model")
+    parser.add_argument("--processing-delay", type=float, default=0.002, help="simulated lamp processing time [s]")
+    args = parser.parse_args(list(argv) or None)
+
+    commands = load(args.journal, args.resource)
+    result = replay(
+        commands,
+        None if args.fast else args.speed,
+        realtime=args.realtime,
+        processing_delay=args.processing_delay,
+    )
+    print(format_summary(result))
+    return 1 if result.mismatches else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main(sys.argv[1:]))
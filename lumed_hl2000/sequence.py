@@ -0,0 +1,219 @@
+"""Timed shutter sequences played from a dedicated thread.
+
+A :class:`ShutterSequence` is a list of ``(offset, is_open)`` events. The
+command bytes of every event are encoded once, when the sequence is built, so
+playback only writes precomputed buffers. :class:`SequencePlayer` plays them
+from its own thread, raised to real-time priority when the OS allows it, and
+schedules every edge against an absolute monotonic deadline ``t0 + offset``:
+a late edge does not delay the following ones, so timing errors never
+accumulate over a long protocol. Each write is started early by the time the
+command takes to cross the serial line, so the lamp receives the complete
+command at the scheduled offset.
+"""
+
+import dataclasses
+import os
+import sys
+import threading
+import time
+from typing import TYPE_CHECKING, Iterable, List, Optional, Tuple
+
+from . import protocol
+from .errors import HL2000CommandError, HL2000ProtocolError
+
+if TYPE_CHECKING:
+    from .driver import HL2000
+
+#: Sleep until this many seconds before a deadline, then busy-wait.
+SPIN_MARGIN = 0.002
+
+
+class ShutterSequence:
+    """Immutable, pre-encoded schedule of shutter edges.
+
+    Args:
+        events: ``(offset, is_open)`` pairs; offsets are seconds from the start
+            of playback and must be non-negative and non-decreasing.
+    """
+
+    def __init__(self, events: Iterable[Tuple[float, bool]]) -> None:
+        frames = []
+        previous = 0.0
+        for offset, is_open in events:
+            offset = float(offset)
+            if offset < previous:
+                raise ValueError(f"event offsets must be non-negative and non-decreasing, got {offset} after {previous}")
+            previous = offset
+            command = protocol.SHUTTER_OPEN if is_open else protocol.SHUTTER_CLOSE
+            frames.append((offset, bool(is_open), command, protocol.FRAMES[command]))
+        self._frames: Tuple[Tuple[float, bool, str, bytes], ...] = tuple(frames)
+
+    @classmethod
+    def pulses(cls, period: float, width: float, count: int, delay: float = 0.0) -> "ShutterSequence":
+        """Build ``count`` open pulses of ``width`` seconds every ``period`` seconds."""
+        if not 0 < width < period:
+            raise ValueError("pulse width must be positive and shorter than the period")
+        events: List[Tuple[float, bool]] = []
+        for i in range(count):
+            start = delay + i * period
+            events += [(start, True), (start + width, False)]
+        return cls(events)
+
+    @property
+    def events(self) -> List[Tuple[float, bool]]:
+        return [(offset, is_open) for offset, is_open, _, _ in self._frames]
+
+    @property
+    def duration(self) -> float:
+        return self._frames[-1][0] if self._frames else 0.0
+
+    def __len__(self) -> int:
+        return len(self._frames)
+
+
+@dataclasses.dataclass(frozen=True)
+class SequenceResult:
+    """Timing of a played sequence.
+
+    Attributes:
+        scheduled: Offset of every event, in seconds.
+        actual: Offset at which each command had fully reached the lamp:
+            when its write started plus its time on the serial line.
+        completed: False if playback was aborted before the last event.
+    """
+
+    scheduled: Tuple[float, ...]
+    actual: Tuple[float, ...]
+    completed: bool
+
+    @property
+    def lateness(self) -> Tuple[float, ...]:
+        return tuple(a - s for s, a in zip(self.scheduled, self.actual))
+
+    @property
+    def max_jitter(self) -> float:
+        return max((abs(x) for x in self.lateness), default=0.0)
+
+
+def _raise_priority() -> None:
+    """Best-effort switch of the calling thread to real-time priority."""
+    try:
+        if sys.platform.startswith("linux"):
+            priority = os.sched_get_priority_min(os.SCHED_FIFO)
+            os.sched_setscheduler(threading.get_native_id(), os.SCHED_FIFO, os.sched_param(priority))
+        elif sys.platform == "win32":
+            import ctypes
+
+            kernel32 = ctypes.windll.kernel32  # type: ignore[attr-defined]
+            kernel32.SetThreadPriority(kernel32.GetCurrentThread(), 15)  # THREAD_PRIORITY_TIME_CRITICAL
+    except (OSError, AttributeError):
+        pass
+
+
+class SequencePlayer:
+    """Play a :class:`ShutterSequence` on a dedicated thread.
+
+    The driver's I/O lock is held for the whole sequence, so polls and other
+    commands wait until playback ends instead of delaying an edge.
+
+    Args:
+        driver: Driver of the lamp.
+        sequence: Sequence to play.
+        close_on_abort: Close the shutter if playback is aborted or fails.
+        realtime_priority: Try to raise the playback thread's priority.
+    """
+
+    def __init__(
+        self,
+        driver: "HL2000",
+        sequence: ShutterSequence,
+        close_on_abort: bool = True,
+        realtime_priority: bool = True,
+    ) -> None:
+        self._driver = driver
+        self._sequence = sequence
+        self._close_on_abort = close_on_abort
+        self._realtime_priority = realtime_priority
+        self._abort = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hl2000-sequence", daemon=True)
+        self._result: Optional[SequenceResult] = None
+        self._error: Optional[BaseException] = None
+
+    def start(self) -> "SequencePlayer":
+        self._thread.start()
+        return self
+
+    @property
+    def playing(self) -> bool:
+        """True from :meth:`start` until playback has ended."""
+        return self._thread.is_alive()
+
+    def abort(self) -> None:
+        """Stop before the next event."""
+        self._abort.set()
+
+    def wait(self, timeout: Optional[float] = None) -> SequenceResult:
+        """Block until playback ends and return its timing.
+
+        Raises:
+            TimeoutError: Playback did not end within ``timeout``.
+            HL2000Error: A command was rejected or misunderstood.
+        """
+        self._thread.join(timeout)
+        if self._thread.is_alive():
+            raise TimeoutError("sequence still playing")
+        if self._error is not None:
+            raise self._error
+        assert self._result is not None
+        return self._result
+
+    def _run(self) -> None:
+        if self._realtime_priority:
+            _raise_priority()
+        frames = self._sequence._frames
+        actual: List[float] = []
+        clock = time.perf_counter
+        sleep = time.sleep
+        try:
+            with self._driver.exclusive() as resource:
+                byte_time = 10.0 / getattr(resource, "baud_rate", protocol.BAUD_RATE)
+                leads = [len(frame[3]) * byte_time for frame in frames]
+                # Leave room for the first write to start early as well.
+                t0 = clock() + max(leads, default=0.0)
+                for (offset, _, command, payload), lead in zip(frames, leads):
+                    deadline = t0 + offset - lead
+                    remaining = deadline - clock() - SPIN_MARGIN
+                    if remaining > 0 and self._abort.wait(remaining):
+                        break
+                    if self._abort.is_set():
+                        break
+                    while clock() < deadline:
+                        pass
+                    issued = clock()
+                    self._driver.write_frame(payload)
+                    # Not when write_frame returns: most backends return once
+                    # the bytes are buffered, before they are on the line.
+                    actual.append(issued + lead - t0)
+                    reply = self._driver.read_reply()
+                    if reply is not None:
+                        reply = reply.strip()
+                    if self._driver.instrumentation.active:
+                        self._driver.report_command(command, reply, clock() - issued, 0, None)
+                    if reply != protocol.ACK:
+                        if reply is None:
+                            raise HL2000ProtocolError(f"{command!r}: corrupted reply")
+                        if protocol.is_error(reply):
+                            raise HL2000CommandError(command, reply)
+                        raise HL2000ProtocolError(f"{command!r}: expected {protocol.ACK!r}, got {reply!r}")
+        except BaseException as exc:
+            self._error = exc
+        completed = len(actual) == len(frames)
+        if not completed and self._close_on_abort:
+            try:
+                self._driver.close_shutter()
+            except Exception as exc:
+                if self._error is None:
+                    self._error = exc
+        self._result = SequenceResult(
+            tuple(frame[0] for frame in frames[: len(actual)]), tuple(actual), completed
+        )
@@ -0,0 +1,273 @@
+"""In-process simulation of the HL-2000-HP-232R serial interface.
+
+:class:`SimulatedResource` mimics the subset of a pyvisa serial resource used
+by this package and answers the RS-232 command set of :mod:`.protocol` with
+realistic timing: every byte costs ten bit times at the configured baud rate
+and the lamp takes ``processing_delay`` seconds to act on each command. Error
+replies can be injected at random (seeded, for reproducible runs) or queued
+explicitly.
+
+:class:`SimulatedResourceManager` can be passed wherever a
+``pyvisa.ResourceManager`` is accepted::
+
+    lamp = HL2000.open("ASRL1::INSTR", SimulatedResourceManager())
+"""
+
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Optional, Set, Tuple
+
+from . import protocol
+
+ERROR_UNKNOWN_COMMAND = "E01"
+ERROR_INJECTED = "E99"
+IDENTITY = protocol.IDENTITY_PREFIX + " SIM"
+
+
+def _visa_error(status: str) -> Exception:
+    """Build the pyvisa exception for ``status``, importing pyvisa only when failing."""
+    from pyvisa import constants, errors
+
+    if status == "invalid_session":
+        return errors.InvalidSession()
+    return errors.VisaIOError(getattr(constants.StatusCode, status))
+
+
+class SimulatedResource:
+    """Fake pyvisa serial resource backed by a simulated lamp.
+
+    Args:
+        resource_name: Name reported by the resource.
+        baud_rate: Line speed used for the transmission-time model.
+        processing_delay: Seconds the lamp takes to handle one command.
+        error_rate: Probability that a command is answered with
+            ``ERROR_INJECTED`` instead of being executed.
+        seed: Seed of the error-injection random generator.
+        realtime: If False, replies are available immediately; useful to
+            measure the Python overhead of the control path alone.
+    """
+
+    def __init__(
+        self,
+        resource_name: str = "ASRL1::INSTR",
+        baud_rate: int = protocol.BAUD_RATE,
+        processing_delay: float = 0.002,
+        error_rate: float = 0.0,
+        seed: Optional[int] = 0,
+        realtime: bool = True,
+        **attributes: Any,
+    ) -> None:
+        self.resource_name = resource_name
+        self.baud_rate = baud_rate
+        self.data_bits = protocol.DATA_BITS
+        self.read_termination = protocol.TERMINATION
+        self.write_termination = protocol.TERMINATION
+        self.timeout: Optional[float] = protocol.DEFAULT_TIMEOUT_MS
+        self.processing_delay = processing_delay
+        self.error_rate = error_rate
+        self.realtime = realtime
+        #: Reply to the identity query.
+        self.identity = IDENTITY
+        for name, value in attributes.items():
+            setattr(self, name, value)
+
+        self.shutter_open = False
+        self.lamp_on = False
+        self.commands_received = 0
+        self._random = random.Random(seed)
+        self._forced_replies: Deque[str] = deque()
+        self._noise: Deque[Tuple[int, bytes]] = deque()
+        self._pending: Deque[Tuple[float, bytes]] = deque()
+        self._inbox = bytearray()
+        self._lock = threading.Lock()
+        self._closed = False
+        self.unplugged = False
+
+    # ------------------------------------------------------------ lamp model
+
+    def inject_error(self, reply: str = ERROR_INJECTED) -> None:
+        """Answer the next command with ``reply`` instead of executing it."""
+        self._forced_replies.append(reply)
+
+    def inject_noise(self, data: bytes, position: int = 0) -> None:
+        """Insert ``data`` into the next reply at byte ``position``, as line noise would."""
+        self._noise.append((position, data))
+
+    def _execute(self, command: str) -> str:
+        self.commands_received += 1
+        if self._forced_replies:
+            return self._forced_replies.popleft()
+        if self.error_rate and self._random.random() < self.error_rate:
+            return ERROR_INJECTED
+        if command == protocol.SHUTTER_OPEN:
+            self.shutter_open = True
+        elif command == protocol.SHUTTER_CLOSE:
+            self.shutter_open = False
+        elif command == protocol.LAMP_ON:
+            self.lamp_on = True
+        elif command == protocol.LAMP_OFF:
+            self.lamp_on = False
+        elif command == protocol.QUERY_SHUTTER:
+            return "1" if self.shutter_open else "0"
+        elif command == protocol.QUERY_LAMP:
+            return "1" if self.lamp_on else "0"
+        elif command == protocol.QUERY_IDENTITY:
+            return self.identity
+        else:
+            return ERROR_UNKNOWN_COMMAND
+        return protocol.ACK
+
+    def _byte_time(self, count: int) -> float:
+        # One start bit, eight data bits, one stop bit.
+        return count * 10.0 / self.baud_rate if self.realtime else 0.0
+
+    # -------------------------------------------------------- pyvisa surface
+
+    def _check_open(self) -> None:
+        if self._closed:
+            raise _visa_error("invalid_session")
+        if self.unplugged:
+            raise _visa_error("error_connection_lost")
+
+    def write_raw(self, message: bytes) -> int:
+        self._check_open()
+        now = time.monotonic()
+        ready = now + self._byte_time(len(message))
+        if self.realtime:
+            # The host blocks until the UART has shifted the bytes out.
+            time.sleep(ready - now)
+        with self._lock:
+            self._inbox += message
+            terminator = self.write_termination.encode()
+            while terminator in self._inbox:
+                frame, _, rest = bytes(self._inbox).partition(terminator)
+                self._inbox[:] = rest
+                # Commands written back to back are handled as soon as their own terminator arrives.
+                arrived = ready - self._byte_time(len(rest))
+                reply = (self._execute(frame.decode("ascii", "replace")) + self.read_termination).encode()
+                if self._noise:
+                    position, noise = self._noise.popleft()
+                    reply = reply[:position] + noise + reply[position:]
+                start = max(arrived, self._pending[-1][0] if self._pending else 0.0)
+                start += self.processing_delay if self.realtime else 0.0
+                self._pending.append((start + self._byte_time(len(reply)), reply))
+        return len(message)
+
+    def write(self, message: str, termination: Optional[str] = None, encoding: str = "ascii") -> int:
+        if termination is None:
+            termination = self.write_termination
+        return self.write_raw((message + termination).encode(encoding))
+
+    @property
+    def bytes_in_buffer(self) -> int:
+        now = time.monotonic()
+        with self._lock:
+            return sum(len(data) for ready, data in self._pending if ready <= now)
+
+    def _take(self, count: Optional[int], until: Optional[bytes]) -> bytes:
+        deadline = None if self.timeout is None else time.monotonic() + self.timeout / 1000.0
+        out = bytearray()
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                while self._pending and self._pending[0][0] <= now:
+                    ready, data = self._pending.popleft()
+                    out += data
+                next_ready = self._pending[0][0] if self._pending else None
+            if until is not None and until in out:
+                head, _, tail = bytes(out).partition(until)
+                self._unread(tail)
+                return head + until
+            if count is not None and len(out) >= count:
+                self._unread(bytes(out[count:]))
+                return bytes(out[:count])
+            wake = next_ready if next_ready is not None else now + 0.001
+            if deadline is not None:
+                if now >= deadline:
+                    self._unread(bytes(out))
+                    raise _visa_error("error_timeout")
+                wake = min(wake, deadline)
+            time.sleep(max(0.0, wake - now))
+
+    def _unread(self, data: bytes) -> None:
+        if data:
+            with self._lock:
+                self._pending.appendleft((0.0, data))
+
+    def read_bytes(self, count: int, **kwargs: Any) -> bytes:
+        self._check_open()
+        return self._take(count, None)
+
+    def read_raw(self, size: Optional[int] = None) -> bytes:
+        self._check_open()
+        return self._take(None, self.read_termination.encode())
+
+    def read(self, termination: Optional[str] = None, encoding: str = "ascii") -> str:
+        if termination is None:
+            termination = self.read_termination
+        data = self._take(None, termination.encode()).decode(encoding)
+        return data[: -len(termination)] if termination else data
+
+    def query(self, message: str, delay: Optional[float] = None) -> str:
+        self.write(message)
+        if delay:
+            time.sleep(delay)
+        return self.read()
+
+    def clear(self) -> None:
+        with self._lock:
+            self._pending.clear()
+            self._inbox.clear()
+
+    def close(self) -> None:
+        self._closed = True
+
+
+class SimulatedResourceManager:
+    """Stand-in for ``pyvisa.ResourceManager`` that opens simulated lamps.
+
+    Args:
+        resource_names: Names reported by :meth:`list_resources`.
+        **defaults: Keyword arguments passed to every
+            :class:`SimulatedResource` created by :meth:`open_resource`.
+    """
+
+    def __init__(self, resource_names: Tuple[str, ...] = ("ASRL1::INSTR",), **defaults: Any) -> None:
+        self._resource_names = tuple(resource_names)
+        self._defaults = defaults
+        self.opened: Dict[str, SimulatedResource] = {}
+        self._unplugged: Set[str] = set()
+
+    def list_resources(self, query: str = "?*::INSTR") -> Tuple[str, ...]:
+        return self._resource_names
+
+    def unplug(self, resource_name: str) -> None:
+        """Simulate the adapter dropping out: I/O and reopening fail until :meth:`replug`."""
+        self._unplugged.add(resource_name)
+        resource = self.opened.get(resource_name)
+        if resource is not None:
+            resource.unplugged = True
+
+    def replug(self, resource_name: str) -> None:
+        """Make ``resource_name`` available again; the lamp keeps its state."""
+        self._unplugged.discard(resource_name)
+
+    def open_resource(self, resource_name: str, **kwargs: Any) -> SimulatedResource:
+        if resource_name not in self._resource_names or resource_name in self._unplugged:
+            raise _visa_error("error_resource_not_found")
+        options: Dict[str, Any] = dict(self._defaults)
+        options.update(kwargs)
+        resource = SimulatedResource(resource_name, **options)
+        previous = self.opened.get(resource_name)
+        if previous is not None:
+            # Same physical lamp behind a reopened port.
+            resource.shutter_open = previous.shutter_open
+            resource.lamp_on = previous.lamp_on
+        self.opened[resource_name] = resource
+        return resource
+
+    def close(self) -> None:
+        for resource in self.opened.values():
+            resource.close()
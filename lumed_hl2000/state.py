@@ -0,0 +1,195 @@
+"""Cached device state refreshed by a background poller.
+
+Readers (widgets, dashboards, scripts) look at :attr:`StatePoller.state`
+instead of querying the lamp, so the serial traffic for status is one poll per
+interval regardless of how many views are watching. Consumers that react to
+changes subscribe to the poller instead of polling its cache::
+
+    unsubscribe = poller.subscribe(lambda state: log.info("%s", state))
+"""
+
+import dataclasses
+import threading
+import time
+from typing import Callable, Optional, Tuple
+
+from .driver import HL2000
+from .worker import IOWorker
+
+
+@dataclasses.dataclass(frozen=True)
+class DeviceState:
+    """Last known state of the lamp.
+
+    Attributes:
+        shutter_open: Shutter position, or None if never read.
+        lamp_on: Lamp power, or None if never read.
+        last_error: Message of the most recent failed poll, cleared by the
+            next successful one.
+        timestamp: ``time.time()`` of the last successful poll, 0 if none.
+        degraded: The serial link is lost and being reopened; the other
+            fields are the last values read before the loss.
+    """
+
+    shutter_open: Optional[bool] = None
+    lamp_on: Optional[bool] = None
+    last_error: Optional[str] = None
+    timestamp: float = 0.0
+    degraded: bool = False
+
+    @property
+    def age(self) -> float:
+        """Seconds since the last successful poll (inf if never polled)."""
+        return time.time() - self.timestamp if self.timestamp else float("inf")
+
+
+def _changed(previous: DeviceState, state: DeviceState) -> bool:
+    """True if ``state`` differs from ``previous`` in more than its timestamp."""
+    return dataclasses.replace(previous, timestamp=state.timestamp) != state
+
+
+StateListener = Callable[[DeviceState], None]
+
+
+def read_state(driver: HL2000) -> DeviceState:
+    """Read every field of :class:`DeviceState` from ``driver`` in one batch."""
+    snapshot = driver.snapshot()
+    return DeviceState(shutter_open=snapshot.shutter_open, lamp_on=snapshot.lamp_on, timestamp=snapshot.timestamp)
+
+
+class StatePoller:
+    """Poll the lamp through ``worker``, cache the result and publish changes.
+
+    Subscribers are called with the new :class:`DeviceState` whenever a poll
+    or a link change alters it; polls that read the same state again only
+    refresh :attr:`state`. One poll is shared by every subscriber, so adding
+    consumers never adds serial traffic.
+
+    Args:
+        worker: Worker owning the serial session.
+        interval: Seconds between polls.
+        max_age: Age in seconds after which :attr:`stale` becomes True.
+            Defaults to three poll intervals.
+    """
+
+    def __init__(self, worker: IOWorker, interval: float = 1.0, max_age: Optional[float] = None) -> None:
+        self._worker = worker
+        self.interval = interval
+        self.max_age = 3 * interval if max_age is None else max_age
+        self._state = DeviceState()
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="hl2000-poller", daemon=True)
+        self._subscribers: Tuple[StateListener, ...] = ()
+        self._subscribers_lock = threading.Lock()
+        # Serializes notifications from the poller and worker threads.
+        self._publish_lock = threading.RLock()
+        self._published = self._state
+        worker.add_link_listener(self._on_link_change)
+
+    def start(self) -> "StatePoller":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        self._stop.set()
+        self._wake.set()
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    @property
+    def worker(self) -> IOWorker:
+        return self._worker
+
+    @property
+    def state(self) -> DeviceState:
+        """The cached state; never touches the serial port."""
+        with self._lock:
+            return self._state
+
+    @property
+    def stale(self) -> bool:
+        return self.state.age > self.max_age
+
+    def subscribe(self, callback: StateListener, replay: bool = True) -> Callable[[], None]:
+        """Call ``callback(state)`` on every state change; returns an unsubscribe function.
+
+        Callbacks run on the poller thread (the worker thread for link
+        changes) and must return quickly; GUI code should hand the state over
+        to its own thread. A callback that raises is ignored for that change.
+
+        Args:
+            replay: Also call ``callback`` with the current state right away
+                if the lamp has been read already.
+        """
+        with self._subscribers_lock:
+            self._subscribers += (callback,)
+        if replay:
+            with self._publish_lock:
+                state = self.state
+                if state.timestamp or state.last_error:
+                    callback(state)
+        return lambda: self.unsubscribe(callback)
+
+    def unsubscribe(self, callback: StateListener) -> None:
+        with self._subscribers_lock:
+            subscribers = list(self._subscribers)
+            if callback in subscribers:
+                subscribers.remove(callback)
+            self._subscribers = tuple(subscribers)
+
+    def _update(self, change: Callable[[DeviceState], DeviceState]) -> DeviceState:
+        """Replace the cached state with ``change(state)`` and publish it if it differs."""
+        with self._lock:
+            previous = self._state
+            state = self._state = change(previous)
+        if _changed(previous, state):
+            self._publish()
+        return state
+
+    def _publish(self) -> None:
+        # Publish the cached state, not the one this thread wrote: another
+        # thread may have replaced it since, and subscribers must end on it.
+        with self._publish_lock:
+            state = self.state
+            if not _changed(self._published, state):
+                return
+            self._published = state
+            for callback in self._subscribers:
+                try:
+                    callback(state)
+                except Exception:
+                    pass
+
+    def refresh_now(self) -> None:
+        """Poll as soon as possible instead of waiting for the next interval."""
+        self._wake.set()
+
+    def _on_link_change(self, degraded: bool) -> None:
+        if degraded:
+            self._update(lambda state: dataclasses.replace(state, degraded=True, last_error="link lost, reconnecting"))
+        else:
+            self.refresh_now()
+
+    def poll(self) -> DeviceState:
+        """Poll once, synchronously, and return the new cached state.
+
+        While the worker is reconnecting nothing is queued; the cached state is
+        only flagged as degraded.
+        """
+        if self._worker.degraded:
+            return self.state
+        future = self._worker.call(read_state)
+        try:
+            state = future.result()
+        except Exception as exc:
+            error = str(exc) or type(exc).__name__
+            return self._update(lambda state: dataclasses.replace(state, last_error=error))
+        return self._update(lambda previous: state)
+
+    def _run(self) -> None:
+        while not self._stop.is_set():
+            self.poll()
+            self._wake.wait(self.interval)
+            self._wake.clear()
@@ -0,0 +1,101 @@
+"""Adaptive read timeout and retry policy for the serial session.
+
+The policy keeps a rolling window of observed reply latencies and derives the
+read timeout from a high percentile of it, so a healthy lamp gets a timeout
+just above its real response time instead of a fixed conservative value.
+Timed-out reads are retried with an exponentially growing timeout and delay.
+"""
+
+import threading
+from collections import deque
+from typing import Deque, Sequence
+
+from . import protocol
+
+
+def percentile(samples: Sequence[float], q: float) -> float:
+    """Return the ``q``-th percentile (0-100) of ``samples``, interpolated."""
+    ordered = sorted(samples)
+    if not ordered:
+        raise ValueError("no samples")
+    position = (len(ordered) - 1) * q / 100.0
+    low = int(position)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (position - low)
+
+
+class AdaptiveTimeout:
+    """Read timeout learned from the lamp's observed latency.
+
+    Args:
+        initial_ms: Timeout used until ``min_samples`` replies were observed.
+        min_ms: Lower bound of the learned timeout.
+        max_ms: Upper bound of any timeout, including retries.
+        quantile: Percentile of the latency window the timeout is based on.
+        multiplier: Safety factor applied to that percentile.
+        window: Number of latencies kept.
+        min_samples: Observations needed before the timeout adapts.
+        retries: Extra attempts after a timed-out read.
+        backoff_s: Delay before the first retry; doubles on each attempt.
+    """
+
+    def __init__(
+        self,
+        initial_ms: float = protocol.DEFAULT_TIMEOUT_MS,
+        min_ms: float = 20.0,
+        max_ms: float = 2000.0,
+        quantile: float = 99.0,
+        multiplier: float = 2.0,
+        window: int = 200,
+        min_samples: int = 20,
+        retries: int = 2,
+        backoff_s: float = 0.01,
+    ) -> None:
+        self.initial_ms = initial_ms
+        self.min_ms = min_ms
+        self.max_ms = max_ms
+        self.quantile = quantile
+        self.multiplier = multiplier
+        self.min_samples = min_samples
+        self.retries = retries
+        self.backoff_s = backoff_s
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._lock = threading.Lock()
+        self._timeout_ms = initial_ms
+        self.failures = 0
+
+    @property
+    def timeout_ms(self) -> float:
+        """Timeout for a first attempt."""
+        return self._timeout_ms
+
+    def timeout_for(self, attempt: int) -> float:
+        """Timeout of attempt number ``attempt`` (0 for the first one)."""
+        return min(self.max_ms, self._timeout_ms * 2**attempt)
+
+    def delay_before(self, attempt: int) -> float:
+        """Seconds to wait before attempt number ``attempt`` (1 for the first retry)."""
+        return self.backoff_s * 2 ** (attempt - 1) if attempt > 0 else 0.0
+
+    def record(self, latency_s: float) -> None:
+        """Record the latency of a successful exchange."""
+        with self._lock:
+            self._latencies.append(latency_s)
+            if len(self._latencies) >= self.min_samples:
+                learned = percentile(self._latencies, self.quantile) * 1e3 * self.multiplier
+                self._timeout_ms = min(self.max_ms, max(self.min_ms, learned))
+
+    def record_failure(self) -> None:
+        """Record a timed-out exchange."""
+        with self._lock:
+            self.failures += 1
+
+
+class FixedTimeout(AdaptiveTimeout):
+    """Constant timeout without retries, e.g. for probing unknown ports."""
+
+    def __init__(self, timeout_ms: float) -> None:
+        super().__init__(initial_ms=timeout_ms, max_ms=timeout_ms, retries=0)
+
+    def record(self, latency_s: float) -> None:
+        pass
@@ -0,0 +1,214 @@
+"""Qt widget for interactive HL-2000-HP-232R control.
+
+The widget never performs serial I/O itself. Button presses post requests to
+an :class:`~.worker.IOWorker` and results come back through Qt signals, which
+are delivered on the GUI thread via queued connections. The displayed state is
+pushed by a :class:`~.state.StatePoller` subscription, so repaints never query
+the lamp and several widgets can share one poll.
+
+Display updates are decoupled from the rate of state changes: at most one
+state notification is queued to the GUI thread at a time, and the widget
+repaints at most ``max_fps`` times per second, drawing only the newest state.
+States superseded before they could be shown are never drawn.
+"""
+
+from concurrent.futures import Future
+from typing import Any, List, Optional
+
+from PyQt5 import QtCore, QtWidgets
+
+from .state import DeviceState, StatePoller
+from .worker import IOWorker
+
+
+class _FutureBridge(QtCore.QObject):
+    """Re-emit worker futures and poller states as Qt signals on the GUI thread."""
+
+    succeeded = QtCore.pyqtSignal(str, object)
+    failed = QtCore.pyqtSignal(str, object)
+    state_posted = QtCore.pyqtSignal()
+
+    def __init__(self, parent: Optional[QtCore.QObject] = None) -> None:
+        super().__init__(parent)
+        self._latest_state: Optional[DeviceState] = None
+        self._posted = False
+
+    def post_state(self, state: DeviceState) -> None:
+        """Store ``state`` from any thread; at most one notification is queued at a time."""
+        self._latest_state = state
+        if not self._posted:
+            self._posted = True
+            self.state_posted.emit()
+
+    def take_state(self) -> Optional[DeviceState]:
+        """Return the newest posted state and re-arm notifications (GUI thread)."""
+        self._posted = False
+        return self._latest_state
+
+    def watch(self, tag: str, future: "Future[Any]") -> None:
+        def done(f: "Future[Any]") -> None:
+            if f.cancelled():
+                return
+            exc = f.exception()
+            if exc is None:
+                self.succeeded.emit(tag, f.result())
+            else:
+                self.failed.emit(tag, exc)
+
+        future.add_done_callback(done)
+
+
+class HL2000Widget(QtWidgets.QWidget):
+    """Shutter and lamp controls with a status line.
+
+    Args:
+        worker: A started worker. If omitted, one is created for
+            ``resource_name`` and stopped when the widget closes.
+        resource_name: VISA resource name, used only when ``worker`` is None.
+            If both are None, the lamp is located with the discovery cache.
+        poller: Shared state poller. If omitted, one polling ``worker`` every
+            ``poll_interval`` seconds is created and stopped with the widget.
+        poll_interval: Poll period of the poller created by the widget.
+        max_fps: Upper bound on display updates per second.
+        parent: Parent widget.
+    """
+
+    def __init__(
+        self,
+        worker: Optional[IOWorker] = None,
+        resource_name: Optional[str] = None,
+        poller: Optional[StatePoller] = None,
+        poll_interval: float = 1.0,
+        max_fps: float = 30.0,
+        parent: Optional[QtWidgets.QWidget] = None,
+    ) -> None:
+        super().__init__(parent)
+        self._owned: List[Any] = []
+        if worker is None:
+            if resource_name is None:
+                worker = IOWorker.autodetect().start()
+            else:
+                worker = IOWorker.for_resource(resource_name).start()
+            self._owned.append(worker)
+        self._worker = worker
+        if poller is None:
+            poller = StatePoller(worker, poll_interval).start()
+            self._owned.insert(0, poller)
+        self._poller = poller
+        self._command_error: Optional[str] = None
+
+        self._bridge = _FutureBridge(self)
+        self._bridge.succeeded.connect(self._on_succeeded)
+        self._bridge.failed.connect(self._on_failed)
+        self._bridge.state_posted.connect(self._on_state_posted)
+
+        self.shutter_button = QtWidgets.QPushButton("Shutter")
+        self.shutter_button.setCheckable(True)
+        self.shutter_button.toggled.connect(self._on_shutter_toggled)
+        self.lamp_button = QtWidgets.QPushButton("Lamp")
+        self.lamp_button.setCheckable(True)
+        self.lamp_button.toggled.connect(self._on_lamp_toggled)
+        self.refresh_button = QtWidgets.QPushButton("Refresh")
+        self.refresh_button.clicked.connect(self.refresh)
+        self.status_label = QtWidgets.QLabel("Connecting...")
+
+        buttons = QtWidgets.QHBoxLayout()
+        buttons.addWidget(self.shutter_button)
+        buttons.addWidget(self.lamp_button)
+        buttons.addWidget(self.refresh_button)
+        layout = QtWidgets.QVBoxLayout(self)
+        layout.addLayout(buttons)
+        layout.addWidget(self.status_label)
+
+        self._state = poller.state
+        self._frame_ms = max(0, int(1000.0 / max_fps))
+        self._last_repaint = QtCore.QElapsedTimer()
+        self._repaint_timer = QtCore.QTimer(self)
+        self._repaint_timer.setSingleShot(True)
+        self._repaint_timer.timeout.connect(self._repaint)
+        # Called on the poller thread; the bridge hands the state to the GUI thread.
+        self._unsubscribe = poller.subscribe(self._bridge.post_state)
+        self._schedule_repaint()
+
+    @property
+    def worker(self) -> IOWorker:
+        return self._worker
+
+    @property
+    def poller(self) -> StatePoller:
+        return self._poller
+
+    def refresh(self) -> None:
+        """Ask the poller to read the lamp now instead of at its next tick."""
+        self._poller.refresh_now()
+
+    def _on_shutter_toggled(self, checked: bool) -> None:
+        self._bridge.watch("shutter", self._worker.submit("set_shutter", checked))
+
+    def _on_lamp_toggled(self, checked: bool) -> None:
+        self._bridge.watch("lamp", self._worker.submit("set_lamp", checked))
+
+    def _set_checked_silently(self, button: QtWidgets.QPushButton, checked: bool) -> None:
+        blocked = button.blockSignals(True)
+        button.setChecked(checked)
+        button.blockSignals(blocked)
+
+    def _on_succeeded(self, tag: str, result: Any) -> None:
+        if self._command_error is not None:
+            self._command_error = None
+            self._schedule_repaint()
+        self.refresh()
+
+    def _on_failed(self, tag: str, exc: BaseException) -> None:
+        self._command_error = f"{tag}: {exc}"
+        self._schedule_repaint()
+        self.refresh()
+
+    def _on_state_posted(self) -> None:
+        state = self._bridge.take_state()
+        if state is not None:
+            self._state = state
+        self._schedule_repaint()
+
+    def _schedule_repaint(self) -> None:
+        """Repaint once the current frame period has elapsed; later requests join it."""
+        if self._repaint_timer.isActive():
+            return
+        elapsed = self._last_repaint.elapsed() if self._last_repaint.isValid() else self._frame_ms
+        self._repaint_timer.start(max(0, self._frame_ms - elapsed))
+
+    def _repaint(self) -> None:
+        self._last_repaint.start()
+        self._redraw(self._state)
+
+    def _redraw(self, state: DeviceState) -> None:
+        if state.shutter_open is not None:
+            self._set_checked_silently(self.shutter_button, state.shutter_open)
+        if state.lamp_on is not None:
+            self._set_checked_silently(self.lamp_button, state.lamp_on)
+        if state.degraded:
+            text = "Link lost, reconnecting..."
+        elif state.timestamp == 0.0:
+            text = state.last_error or "Connecting..."
+        else:
+            text = (
+                f"Shutter {'open' if state.shutter_open else 'closed'}, "
+                f"lamp {'on' if state.lamp_on else 'off'}"
+            )
+            if state.last_error:
+                text += f" (stale: {state.last_error})"
+        if self._command_error:
+            text += f"\n{self._command_error}"
+        # Restyling and relayout are the expensive part of a repaint; skip them when unchanged.
+        style = "color: red" if state.degraded else ""
+        if self.status_label.styleSheet() != style:
+            self.status_label.setStyleSheet(style)
+        if self.status_label.text() != text:
+            self.status_label.setText(text)
+
+    def closeEvent(self, event: Any) -> None:
+        self._unsubscribe()
+        self._repaint_timer.stop()
+        for owned in self._owned:
+            owned.stop()
+        super().closeEvent(event)
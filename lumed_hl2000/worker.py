@@ -0,0 +1,337 @@
+"""Background I/O worker that owns the lamp's serial session.
+
+The worker runs a single thread that opens the driver, then executes queued
+requests one at a time. Callers never touch the serial port: they post a
+request and get back a :class:`concurrent.futures.Future` that resolves on
+the worker thread once the lamp has answered.
+
+Writes to the same setting are coalesced: if a shutter (or lamp) command is
+still waiting in the queue when a newer one for the same setting arrives, the
+older one is dropped and its future resolves with the outcome of the newer
+one. The surviving command moves to the back of the queue, so commands for
+different settings still reach the lamp in the order they were last issued.
+Any other request (a query, or a call without a setting) is a barrier: writes
+queued before it are never merged with writes queued after it, so a caller
+always reads back its own write.
+
+Urgent requests (safety shutter closes) skip ahead of everything already
+queued, and a later normal write to the same setting never replaces them.
+
+If the serial link is lost (e.g. the USB adapter drops out), the worker marks
+itself degraded, reopens the port in the background with exponential backoff,
+replays the last commanded shutter and lamp state and then retries the request
+that hit the failure. Requests queued meanwhile simply wait; a setting with a
+write among them is left for that write instead of being replayed.
+"""
+
+import itertools
+import queue
+import threading
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from .driver import HL2000, is_link_error
+from .errors import HL2000ClosedError
+
+_STOP = object()
+_URGENT, _NORMAL, _LAST = range(3)
+
+#: Driver methods that write a setting, mapped to the setting they write.
+SETTINGS: Dict[str, str] = {
+    "set_shutter": "shutter",
+    "open_shutter": "shutter",
+    "close_shutter": "shutter",
+    "set_lamp": "lamp",
+    "lamp_on": "lamp",
+    "lamp_off": "lamp",
+}
+
+
+class _Request:
+    __slots__ = ("future", "fn", "setting", "urgent", "superseded", "absorbed")
+
+    def __init__(
+        self, future: "Future[Any]", fn: Callable[[HL2000], Any], setting: Optional[Hashable], urgent: bool
+    ) -> None:
+        self.future = future
+        self.fn = fn
+        self.setting = setting
+        self.urgent = urgent
+        self.superseded = False
+        # Futures of the requests this one replaced, resolved with its outcome.
+        self.absorbed: List["Future[Any]"] = []
+        future.add_done_callback(self._resolve_absorbed)
+
+    def supersede(self, previous: "_Request") -> None:
+        """Take over ``previous``, which will not run."""
+        previous.superseded = True
+        self.absorbed = previous.absorbed + [previous.future]
+        previous.absorbed = []
+
+    def _resolve_absorbed(self, future: "Future[Any]") -> None:
+        absorbed, self.absorbed = self.absorbed, []
+        for target in absorbed:
+            _forward(future, target)
+
+
+def _forward(source: "Future[Any]", target: "Future[Any]") -> None:
+    """Resolve ``target`` with the outcome of ``source``."""
+    if source.cancelled():
+        target.cancel()
+    elif target.set_running_or_notify_cancel():
+        exc = source.exception()
+        if exc is None:
+            target.set_result(source.result())
+        else:
+            target.set_exception(exc)
+
+
+class IOWorker:
+    """Serialize every driver call onto one dedicated thread.
+
+    Args:
+        opener: Called on the worker thread to create the driver, so that
+            opening the serial port does not block the caller either. Also
+            called to reopen the port after a link loss.
+        name: Name given to the worker thread.
+        reconnect: Reopen the port when the link is lost instead of failing.
+        reconnect_delay: Delay before the first reopen attempt; doubles after
+            each failed attempt up to ``max_reconnect_delay``.
+        max_reconnect_delay: Upper bound of the reopen delay.
+    """
+
+    def __init__(
+        self,
+        opener: Callable[[], HL2000],
+        name: str = "hl2000-io",
+        reconnect: bool = True,
+        reconnect_delay: float = 0.5,
+        max_reconnect_delay: float = 10.0,
+    ) -> None:
+        self._opener = opener
+        self.reconnect = reconnect
+        self.reconnect_delay = reconnect_delay
+        self.max_reconnect_delay = max_reconnect_delay
+        self._queue: "queue.PriorityQueue[Any]" = queue.PriorityQueue()
+        self._order = itertools.count()
+        self._thread = threading.Thread(target=self._run, name=name, daemon=True)
+        self._driver: Optional[HL2000] = None
+        self._stopping = False
+        self._submit_lock = threading.Lock()
+        self._pending_settings: Dict[Hashable, _Request] = {}
+        self.coalesced = 0
+        self._commanded: Dict[Hashable, Callable[[HL2000], Any]] = {}
+        self._stop_event = threading.Event()
+        self._degraded = False
+        self._link_listeners: List[Callable[[bool], None]] = []
+        self.reconnects = 0
+
+    @classmethod
+    def for_resource(cls, resource_name: str, **open_kwargs: Any) -> "IOWorker":
+        """Create a worker that opens ``resource_name`` with :meth:`HL2000.open`."""
+        return cls(lambda: HL2000.open(resource_name, **open_kwargs))
+
+    @classmethod
+    def autodetect(cls, **find_kwargs: Any) -> "IOWorker":
+        """Create a worker that finds a lamp with :func:`~.discovery.find_lamp`.
+
+        Discovery runs on the worker thread, like opening the port.
+        """
+
+        def opener() -> HL2000:
+            from .discovery import find_lamp
+
+            return HL2000.open(find_lamp(**find_kwargs), find_kwargs.get("resource_manager"))
+
+        return cls(opener)
+
+    def start(self) -> "IOWorker":
+        self._thread.start()
+        return self
+
+    def stop(self, timeout: Optional[float] = None) -> None:
+        """Finish queued requests, close the driver and join the thread."""
+        with self._submit_lock:
+            if self._stopping:
+                return
+            self._stopping = True
+            self._stop_event.set()
+            self._put(_LAST, _STOP)
+        if self._thread.is_alive():
+            self._thread.join(timeout)
+
+    @property
+    def running(self) -> bool:
+        return self._thread.is_alive() and not self._stopping
+
+    @property
+    def driver(self) -> Optional[HL2000]:
+        """The driver once opened, for thread-safe calls that must not queue."""
+        return self._driver
+
+    @property
+    def degraded(self) -> bool:
+        """True while the link is lost and the worker is trying to reopen it."""
+        return self._degraded
+
+    def add_link_listener(self, callback: Callable[[bool], None]) -> None:
+        """Call ``callback(degraded)`` on the worker thread when the link drops or recovers."""
+        self._link_listeners.append(callback)
+
+    def _set_degraded(self, degraded: bool) -> None:
+        self._degraded = degraded
+        for callback in list(self._link_listeners):
+            try:
+                callback(degraded)
+            except Exception:
+                pass
+
+    def _put(self, priority: int, item: Any) -> None:
+        self._queue.put((priority, next(self._order), item))
+
+    def _get(self, block: bool = True) -> Any:
+        return self._queue.get(block)[2]
+
+    def call(
+        self, fn: Callable[[HL2000], Any], setting: Optional[Hashable] = None, urgent: bool = False
+    ) -> "Future[Any]":
+        """Queue ``fn(driver)`` for execution on the worker thread.
+
+        Args:
+            fn: Called with the driver on the worker thread.
+            setting: If given, ``fn`` writes this setting and supersedes any
+                queued request for the same setting that has not started yet,
+                unless that request is urgent and this one is not. If None,
+                no queued write is superseded by a later one.
+            urgent: Run before every request that is already queued.
+        """
+        future: "Future[Any]" = Future()
+        request = _Request(future, fn, setting, urgent)
+        with self._submit_lock:
+            if self._stopping:
+                future.set_exception(HL2000ClosedError("worker is stopped"))
+                return future
+            if setting is not None:
+                previous = self._pending_settings.get(setting)
+                # An urgent write (a safety close) is never replaced by a normal one; both run.
+                if previous is not None and (urgent or not previous.urgent):
+                    request.supersede(previous)
+                    self.coalesced += 1
+                self._pending_settings[setting] = request
+            else:
+                self._pending_settings.clear()
+            self._put(_URGENT if urgent else _NORMAL, request)
+        return future
+
+    def submit(self, method: str, *args: Any, urgent: bool = False) -> "Future[Any]":
+        """Queue ``driver.<method>(*args)`` for execution on the worker thread.
+
+        Methods listed in :data:`SETTINGS` are coalesced per setting.
+        """
+        return self.call(lambda driver: getattr(driver, method)(*args), SETTINGS.get(method), urgent)
+
+    def _run(self) -> None:
+        open_error: Optional[BaseException] = None
+        try:
+            self._driver = self._opener()
+        except BaseException as exc:  # reported through every queued future
+            open_error = exc
+        while True:
+            item = self._get()
+            if item is _STOP:
+                break
+            if item.setting is not None:
+                with self._submit_lock:
+                    if item.superseded:
+                        continue
+                    if self._pending_settings.get(item.setting) is item:
+                        del self._pending_settings[item.setting]
+            future, fn = item.future, item.fn
+            if not future.set_running_or_notify_cancel():
+                continue
+            if open_error is not None:
+                future.set_exception(open_error)
+                continue
+            if item.setting is not None:
+                # Recorded before running: a reopen during this write must
+                # replay it, not the setting it is replacing.
+                replaced = self._commanded.get(item.setting)
+                self._commanded[item.setting] = fn
+            while True:
+                try:
+                    result = fn(self._driver)
+                except BaseException as exc:
+                    if self.reconnect and is_link_error(exc) and self._reopen():
+                        continue
+                    if item.setting is not None and not is_link_error(exc):
+                        # The lamp rejected the write and kept its previous setting.
+                        if replaced is None:
+                            del self._commanded[item.setting]
+                        else:
+                            self._commanded[item.setting] = replaced
+                    future.set_exception(exc)
+                else:
+                    future.set_result(result)
+                break
+        self._drain()
+        self._close_driver()
+
+    def _close_driver(self) -> None:
+        if self._driver is not None:
+            try:
+                self._driver.close()
+            except Exception:
+                pass
+
+    def _reopen(self) -> bool:
+        """Reopen the port and replay the commanded state; False if stopped first.
+
+        Settings with a write still queued are not replayed; that write will
+        set them. A replayed write the lamp rejects is dropped from the
+        commanded state (the driver reports it through its instrumentation);
+        only a link error during the replay starts another reopen attempt.
+        """
+        self._set_degraded(True)
+        self._close_driver()
+        delay = self.reconnect_delay
+        while not self._stop_event.wait(delay):
+            delay = min(delay * 2, self.max_reconnect_delay)
+            try:
+                driver = self._opener()
+            except Exception:
+                continue
+            if not self._replay(driver):
+                try:
+                    driver.close()
+                except Exception:
+                    pass
+                continue
+            self._driver = driver
+            self.reconnects += 1
+            self._set_degraded(False)
+            return True
+        return False
+
+    def _replay(self, driver: HL2000) -> bool:
+        """Write the commanded state to ``driver``; False if the link failed."""
+        with self._submit_lock:
+            pending = set(self._pending_settings)
+        for setting, replay in list(self._commanded.items()):
+            if setting in pending:
+                continue
+            try:
+                replay(driver)
+            except Exception as exc:
+                if is_link_error(exc):
+                    return False
+                del self._commanded[setting]
+        return True
+
+    def _drain(self) -> None:
+        while True:
+            try:
+                item = self._get(block=False)
+            except queue.Empty:
+                return
+            if item is not _STOP and not item.superseded:
+                item.future.set_exception(HL2000ClosedError("worker is stopped"))
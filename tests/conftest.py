@@ -0,0 +1,32 @@
+import pytest
+
+from lumed_hl2000 import HL2000, IOWorker
+from lumed_hl2000.sim import SimulatedResourceManager
+
+RESOURCE_NAME = "ASRL1::INSTR"
+
+
+@pytest.fixture
+def manager():
+    """Simulated lamps that answer instantly."""
+    return SimulatedResourceManager((RESOURCE_NAME,), realtime=False)
+
+
+@pytest.fixture
+def lamp(manager):
+    driver = HL2000.open(RESOURCE_NAME, manager, timeout_ms=100)
+    yield driver
+    driver.close()
+
+
+@pytest.fixture
+def sim(lamp, manager):
+    """The simulated resource behind ``lamp``."""
+    return manager.opened[RESOURCE_NAME]
+
+
+@pytest.fixture
+def worker(manager):
+    worker = IOWorker(lambda: HL2000.open(RESOURCE_NAME, manager, timeout_ms=100), reconnect_delay=0.01).start()
+    yield worker
+    worker.stop(timeout=5)
@@ -0,0 +1,44 @@
+import asyncio
+
+import pytest
+
+from lumed_hl2000 import AsyncHL2000, HL2000, HL2000ClosedError, HL2000CommandError, IOWorker
+
+from .conftest import RESOURCE_NAME
+
+
+def _lamp(manager):
+    return AsyncHL2000(IOWorker(lambda: HL2000.open(RESOURCE_NAME, manager, timeout_ms=100)))
+
+
+def test_coroutines_drive_the_lamp(manager):
+    async def session():
+        async with _lamp(manager) as lamp:
+            await asyncio.gather(lamp.lamp_on(), lamp.open_shutter())
+            assert await lamp.status() == {"shutter_open": True, "lamp_on": True}
+            await lamp.set_shutter(False)
+            return await lamp.is_shutter_open()
+
+    assert asyncio.run(session()) is False
+    assert manager.opened[RESOURCE_NAME].lamp_on
+
+
+def test_errors_are_raised_in_the_coroutine(manager):
+    async def session():
+        async with _lamp(manager) as lamp:
+            manager.opened[RESOURCE_NAME].inject_error()
+            await lamp.open_shutter()
+
+    with pytest.raises(HL2000CommandError):
+        asyncio.run(session())
+
+
+def test_open_after_close_raises_closed_error(manager):
+    async def session():
+        lamp = _lamp(manager)
+        await lamp.open()
+        await lamp.close()
+        await lamp.open()
+
+    with pytest.raises(HL2000ClosedError):
+        asyncio.run(session())
@@ -0,0 +1,57 @@
+import io
+import threading
+
+import pytest
+
+from lumed_hl2000 import HL2000, IOWorker
+from lumed_hl2000.cli import build_parser, main, read_sequence
+from lumed_hl2000.daemon import LampDaemon
+
+from .conftest import RESOURCE_NAME
+
+
+def test_daemon_flag_keeps_the_action(manager, tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("XDG_RUNTIME_DIR", str(tmp_path))
+    daemon = LampDaemon(IOWorker(lambda: HL2000.open(RESOURCE_NAME, manager)))
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    try:
+        assert main(["--daemon", "shutter", "open"]) == 0
+        assert manager.opened[RESOURCE_NAME].shutter_open
+        assert main(["--daemon", "shutter", "close"]) == 0
+        assert not manager.opened[RESOURCE_NAME].shutter_open
+        assert main(["--daemon-address", daemon.address, "status", "--json"]) == 0
+        assert capsys.readouterr().out.strip() == '{"shutter_open": false, "lamp_on": false}'
+    finally:
+        daemon.shutdown()
+        thread.join(5)
+        daemon.close()
+
+
+def test_read_sequence_parses_offsets_and_comments():
+    sequence = read_sequence(io.StringIO("# exposure\n0 open\n0.5, close  # end\n\n1.0 OPEN\n"))
+    assert sequence.events == [(0.0, True), (0.5, False), (1.0, True)]
+    with pytest.raises(ValueError, match="line 2"):
+        read_sequence(io.StringIO("0 open\n0.5 shut\n"))
+
+
+def test_parser_rejects_unknown_states():
+    with pytest.raises(SystemExit):
+        build_parser().parse_args(["shutter", "ajar"])
+
+
+def test_simulated_actions(capsys):
+    assert main(["--simulate", "shutter", "open"]) == 0
+    assert main(["--simulate", "lamp", "on"]) == 0
+    # Every --simulate run talks to a fresh simulated lamp.
+    assert main(["--simulate", "status"]) == 0
+    assert capsys.readouterr().out == "shutter closed\nlamp off\n"
+    assert main(["--simulate", "pulses", "--period", "0.02", "--width", "0.01", "--count", "2"]) == 0
+    assert capsys.readouterr().out.startswith("completed: 4 edges")
+
+
+def test_bad_sequence_file_fails_before_opening_the_port(tmp_path, capsys):
+    path = tmp_path / "exposure.txt"
+    path.write_text("0 open\nsoon close\n")
+    assert main(["-r", "ASRL9::INSTR", "sequence", str(path)]) == 1
+    assert capsys.readouterr().err.startswith("error: line 2")
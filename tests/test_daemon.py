@@ -0,0 +1,62 @@
+import os
+import stat
+import threading
+
+import pytest
+
+from lumed_hl2000 import HL2000, IOWorker
+from lumed_hl2000.client import RemoteHL2000
+from lumed_hl2000.daemon import LampDaemon
+from lumed_hl2000.errors import HL2000RemoteError
+
+from .conftest import RESOURCE_NAME
+
+
+@pytest.fixture
+def daemon(manager, tmp_path):
+    worker = IOWorker(lambda: HL2000.open(RESOURCE_NAME, manager))
+    daemon = LampDaemon(worker, str(tmp_path / "hl2000.sock"))
+    thread = threading.Thread(target=daemon.serve_forever, daemon=True)
+    thread.start()
+    yield daemon
+    daemon.shutdown()
+    thread.join(5)
+    daemon.close()
+
+
+def test_driver_methods_through_the_daemon(daemon, manager):
+    with RemoteHL2000(daemon.address) as lamp:
+        lamp.lamp_on()
+        assert lamp.is_lamp_on() is True
+        assert lamp.status() == {"shutter_open": False, "lamp_on": True}
+        assert lamp.snapshot().lamp_on is True
+    assert manager.opened[RESOURCE_NAME].lamp_on
+
+
+def test_pipelined_requests_all_resolve(daemon, manager):
+    with RemoteHL2000(daemon.address) as lamp:
+        futures = [lamp.submit("set_shutter", i % 2 == 0) for i in range(500)]
+        queries = [lamp.submit("is_shutter_open") for _ in range(10)]
+        for future in futures:
+            assert future.result(5) is None
+        assert queries[-1].result(5) is False
+    assert manager.opened[RESOURCE_NAME].shutter_open is False
+
+
+def test_remote_errors_carry_their_type(daemon):
+    with RemoteHL2000(daemon.address) as lamp:
+        with pytest.raises(HL2000RemoteError):
+            lamp.request("no_such_method")
+        assert lamp.is_lamp_on() is False
+
+
+def test_unix_socket_is_owner_only(daemon):
+    assert stat.S_IMODE(os.stat(daemon.address).st_mode) == 0o600
+
+
+def test_non_loopback_host_needs_opt_in(manager):
+    worker = IOWorker(lambda: HL2000.open(RESOURCE_NAME, manager))
+    with pytest.raises(ValueError):
+        LampDaemon(worker, ("0.0.0.0", 0))
+    daemon = LampDaemon(worker, ("127.0.0.1", 0))
+    daemon.close()
@@ -0,0 +1,63 @@
+import json
+import time
+
+import pytest
+
+from lumed_hl2000.discovery import DiscoveryCache, find_lamps, probe, probe_many
+from lumed_hl2000.sim import IDENTITY, SimulatedResourceManager
+
+
+def test_scan_fills_the_cache(tmp_path):
+    cache = DiscoveryCache(str(tmp_path / "discovery.json"))
+    manager = SimulatedResourceManager(("ASRL1::INSTR",), realtime=False)
+    assert find_lamps(manager, cache) == ["ASRL1::INSTR"]
+    reloaded = DiscoveryCache(cache.path).entries
+    assert reloaded["ASRL1::INSTR"].identity == IDENTITY
+
+
+def test_old_cache_entries_are_still_read(tmp_path):
+    path = tmp_path / "discovery.json"
+    entry = {"resource_name": "ASRL1::INSTR", "baud_rate": 9600, "identity": IDENTITY, "last_seen": 1.0}
+    path.write_text(json.dumps({"lamps": [entry]}))
+    assert list(DiscoveryCache(str(path)).entries) == ["ASRL1::INSTR"]
+
+
+class _Ports(SimulatedResourceManager):
+    """Lamps on ``lamps``; every other port never answers in time."""
+
+    def __init__(self, names, lamps):
+        super().__init__(names)
+        self._lamps = set(lamps)
+
+    def open_resource(self, resource_name, **kwargs):
+        if resource_name not in self._lamps:
+            kwargs["processing_delay"] = 5.0
+        return super().open_resource(resource_name, **kwargs)
+
+
+SILENT = tuple(f"ASRL{i}::INSTR" for i in range(2, 10))
+
+
+def _timed(fn, *args, **kwargs):
+    start = time.perf_counter()
+    result = fn(*args, **kwargs)
+    return result, time.perf_counter() - start
+
+
+def test_ports_are_probed_concurrently():
+    pytest.importorskip("pyvisa")
+    manager = _Ports(SILENT, ())
+    result, one = _timed(probe, manager, SILENT[0], 50)
+    assert result is None
+    results, elapsed = _timed(probe_many, manager, SILENT, 50)
+    assert results == {name: None for name in SILENT}
+    assert elapsed < len(SILENT) * one / 2
+
+
+def test_first_returns_without_waiting_for_silent_ports():
+    pytest.importorskip("pyvisa")
+    manager = _Ports(("ASRL1::INSTR",) + SILENT, ("ASRL1::INSTR",))
+    one = _timed(probe, manager, SILENT[0], 200)[1]
+    results, elapsed = _timed(probe_many, manager, ("ASRL1::INSTR",) + SILENT, 200, first=True)
+    assert results["ASRL1::INSTR"] is not None
+    assert elapsed < one / 2
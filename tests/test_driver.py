@@ -0,0 +1,113 @@
+import pytest
+
+from lumed_hl2000 import HL2000, HL2000ClosedError, HL2000CommandError, HL2000Error, HL2000ProtocolError
+from lumed_hl2000.sequence import ShutterSequence
+from lumed_hl2000.sim import ERROR_INJECTED, IDENTITY, SimulatedResourceManager
+
+
+def test_commands_change_simulated_state(lamp, sim):
+    lamp.open_shutter()
+    lamp.lamp_on()
+    assert sim.shutter_open and sim.lamp_on
+    assert lamp.is_shutter_open() and lamp.is_lamp_on()
+    lamp.set_shutter(False)
+    lamp.set_lamp(False)
+    assert not lamp.is_shutter_open() and not lamp.is_lamp_on()
+
+
+def test_identify(lamp):
+    assert lamp.identify() == IDENTITY
+
+
+def test_snapshot_reads_both_fields(lamp, sim):
+    sim.lamp_on = True
+    snapshot = lamp.snapshot()
+    assert (snapshot.shutter_open, snapshot.lamp_on) == (False, True)
+    assert sim.commands_received == 2
+
+
+def test_error_reply_raises_command_error(lamp, sim):
+    sim.inject_error()
+    with pytest.raises(HL2000CommandError) as info:
+        lamp.open_shutter()
+    assert info.value.reply == ERROR_INJECTED
+    lamp.open_shutter()
+    assert sim.shutter_open
+
+
+def test_error_in_batch_does_not_desynchronise(lamp, sim):
+    sim.inject_error()
+    with pytest.raises(HL2000CommandError):
+        lamp.snapshot()
+    assert lamp.is_lamp_on() is False
+
+
+def test_corrupted_reply_is_retried(lamp, sim):
+    sim.lamp_on = True
+    sim.inject_noise(b"\xff", 1)
+    assert lamp.is_lamp_on()
+    assert lamp._parser.corrupted == 1
+
+
+def test_persistent_corruption_raises(lamp, sim):
+    for _ in range(lamp.timeout_policy.retries + 1):
+        sim.inject_noise(b"\xff", 1)
+    with pytest.raises(HL2000ProtocolError):
+        lamp.open_shutter()
+
+
+def test_timeout_is_retried_with_longer_timeout():
+    pytest.importorskip("pyvisa")
+    manager = SimulatedResourceManager(("ASRL1::INSTR",), processing_delay=0.06)
+    with HL2000.open("ASRL1::INSTR", manager, timeout_ms=50) as lamp:
+        assert lamp.is_shutter_open() is False
+        assert lamp.timeout_policy.failures == 1
+
+
+def test_closed_driver_refuses_commands(lamp):
+    lamp.close()
+    with pytest.raises(HL2000ClosedError):
+        lamp.open_shutter()
+
+
+def test_sequence_plays_every_edge(lamp, sim):
+    result = lamp.play_sequence(ShutterSequence([(0.0, True), (0.005, False), (0.010, True)]))
+    assert result.completed
+    assert len(result.actual) == 3
+    assert sim.shutter_open
+    # The simulator's writes return at once; edges still land on schedule.
+    assert result.max_jitter < 0.0015
+
+
+def test_second_sequence_is_refused_while_one_plays(lamp, sim):
+    player = lamp.start_sequence(ShutterSequence([(0.0, True), (0.5, False)]))
+    with pytest.raises(HL2000Error):
+        lamp.start_sequence(ShutterSequence([(0.0, True)]))
+    lamp.abort_sequence()
+    assert not player.wait(timeout=5).completed
+    assert not sim.shutter_open
+    lamp.play_sequence(ShutterSequence([(0.0, True)]))
+    assert sim.shutter_open
+
+
+def test_reply_split_by_noise_does_not_desynchronise(lamp, sim):
+    # A terminator inside the noise splits one reply into two frames.
+    sim.inject_noise(b"x\r", 0)
+    lamp.open_shutter()
+    assert sim.shutter_open
+    for _ in range(3):
+        snapshot = lamp.snapshot()
+        assert (snapshot.shutter_open, snapshot.lamp_on) == (True, False)
+
+
+def test_stale_reply_is_dropped_before_the_next_command(lamp, sim):
+    sim.inject_noise(b"OK\r", 0)
+    assert lamp.is_lamp_on() is False
+    assert lamp.is_shutter_open() is False
+
+
+def test_reply_of_the_wrong_kind_raises(lamp, sim):
+    for _ in range(lamp.timeout_policy.retries + 1):
+        sim.inject_error("1")
+    with pytest.raises(HL2000ProtocolError, match="unexpected reply"):
+        lamp.open_shutter()
@@ -0,0 +1,49 @@
+from lumed_hl2000.framing import MAX_REPLY_LENGTH, ReplyParser
+
+
+def _drain(parser):
+    return [parser.pop() for _ in range(len(parser))]
+
+
+def test_replies_split_across_reads():
+    parser = ReplyParser()
+    parser.feed(b"O")
+    assert len(parser) == 0
+    parser.feed(b"K\r1\r")
+    assert _drain(parser) == ["OK", "1"]
+
+
+def test_leading_noise_is_dropped():
+    parser = ReplyParser()
+    parser.feed(b"\x00\xff\nOK\r")
+    assert _drain(parser) == ["OK"]
+    assert parser.corrupted == 0
+
+
+def test_noise_only_frames_are_ignored():
+    parser = ReplyParser()
+    parser.feed(b"\r\x00\rOK\r")
+    assert _drain(parser) == ["OK"]
+
+
+def test_noise_inside_a_frame_marks_it_corrupted():
+    parser = ReplyParser()
+    parser.feed(b"O\xffK\r1\r")
+    assert _drain(parser) == [None, "1"]
+    assert parser.corrupted == 1
+
+
+def test_overlong_frame_is_skipped_up_to_the_next_terminator():
+    parser = ReplyParser()
+    parser.feed(b"A" * (MAX_REPLY_LENGTH + 1))
+    parser.feed(b"AAAA\rOK\r")
+    assert _drain(parser) == [None, "OK"]
+    assert parser.corrupted == 1
+
+
+def test_reset_drops_partial_and_queued_replies():
+    parser = ReplyParser()
+    parser.feed(b"OK\r1")
+    parser.reset()
+    parser.feed(b"0\r")
+    assert _drain(parser) == ["0"]
@@ -0,0 +1,81 @@
+import os
+
+import pytest
+
+from lumed_hl2000.errors import HL2000Error
+from lumed_hl2000.instrumentation import Instrumentation
+from lumed_hl2000.journal import DATA_OFFSET, RECORD_SIZE, Journal, JournalReader
+from lumed_hl2000.sim import SimulatedResourceManager
+from lumed_hl2000.state import DeviceState
+from lumed_hl2000 import HL2000
+
+
+def _session(path, manager, name="ASRL1::INSTR"):
+    instrumentation = Instrumentation()
+    journal = Journal(str(path)).attach(instrumentation)
+    lamp = HL2000(manager.open_resource(name), instrumentation=instrumentation)
+    try:
+        lamp.lamp_on()
+        lamp.open_shutter()
+        lamp.is_shutter_open()
+        lamp.close_shutter()
+        journal.record_state(DeviceState(shutter_open=False, lamp_on=True, timestamp=1.0), name)
+    finally:
+        lamp.close()
+        journal.close()
+
+
+def test_round_trip(tmp_path):
+    path = tmp_path / "session.hl2j"
+    manager = SimulatedResourceManager(("ASRL/dev/ttyUSB0::INSTR",), realtime=False)
+    _session(path, manager, "ASRL/dev/ttyUSB0::INSTR")
+    with JournalReader(str(path)) as journal:
+        records = list(journal)
+        commands = [(r.command, r.reply) for r in records if r.kind == "command"]
+        assert commands == [("L1", "OK"), ("S1", "OK"), ("S?", "1"), ("S0", "OK")]
+        assert all(r.resource_name == "ASRL/dev/ttyUSB0::INSTR" for r in records)
+        state = records[-1]
+        assert (state.kind, state.shutter_open, state.lamp_on) == ("state", False, True)
+        timestamps = [r.timestamp for r in records]
+        assert timestamps == sorted(timestamps)
+        middle = list(journal.between(timestamps[1], timestamps[3]))
+        assert [r.command for r in middle] == ["S1", "S?"]
+        [(name, opened, closed)] = journal.shutter_intervals()
+        assert opened <= closed
+
+
+def test_reopen_appends_and_drops_torn_record(tmp_path):
+    path = tmp_path / "session.hl2j"
+    manager = SimulatedResourceManager(("ASRL1::INSTR",), realtime=False)
+    _session(path, manager)
+    with open(path, "ab") as f:
+        f.write(b"torn")
+    _session(path, manager)
+    with JournalReader(str(path)) as journal:
+        assert len([r for r in journal if r.kind == "command"]) == 8
+        assert len(journal.shutter_intervals()) == 2
+
+
+def test_names_live_in_the_table(tmp_path):
+    path = tmp_path / "session.hl2j"
+    names = ("ASRL/dev/serial/by-id/usb-FTDI_FT232R_USB_UART_A50285BI-if00-port0::INSTR", "ASRL2::INSTR")
+    manager = SimulatedResourceManager(names, realtime=False)
+    for name in names:
+        _session(path, manager, name)
+    assert os.path.getsize(path) == DATA_OFFSET + 10 * RECORD_SIZE
+    with JournalReader(str(path)) as journal:
+        assert journal.resource_names == dict(enumerate(names))
+        assert [r.resource_name for r in journal if r.kind == "state"] == list(names)
+
+
+def test_other_files_are_never_overwritten(tmp_path):
+    path = tmp_path / "notes.txt"
+    path.write_text("not a journal\n")
+    with pytest.raises(HL2000Error):
+        Journal(str(path))
+    assert path.read_text() == "not a journal\n"
+    empty = tmp_path / "empty.hl2j"
+    empty.touch()
+    Journal(str(empty)).close()
+    with JournalReader(str(empty)) as journal:
+        assert len(journal) == 0
@@ -0,0 +1,32 @@
+import threading
+
+from lumed_hl2000 import LampManager
+from lumed_hl2000.sim import SimulatedResourceManager
+
+
+def test_broadcast_reaches_every_lamp():
+    resource_manager = SimulatedResourceManager(("ASRL1::INSTR", "ASRL2::INSTR"), realtime=False)
+    with LampManager(resource_manager) as lamps:
+        for name in resource_manager.list_resources():
+            lamps.add(name)
+        lamps.broadcast_wait("lamp_on", timeout=5)
+        assert all(sim.lamp_on for sim in resource_manager.opened.values())
+        report = lamps.close_all_shutters(deadline=5)
+        assert report.all_closed
+        assert sorted(report.acknowledged) == ["ASRL1::INSTR", "ASRL2::INSTR"]
+
+
+def test_close_all_shutters_is_not_replaced_by_a_later_open():
+    resource_manager = SimulatedResourceManager(("ASRL1::INSTR",), realtime=False)
+    with LampManager(resource_manager) as lamps:
+        worker = lamps.add("ASRL1::INSTR")
+        worker.submit("open_shutter").result(5)
+        gate = threading.Event()
+        worker.call(lambda driver: gate.wait(5))
+        report = lamps.close_all_shutters(deadline=0.0)
+        assert report.timed_out == ("ASRL1::INSTR",)
+        later_open = worker.submit("open_shutter")
+        gate.set()
+        later_open.result(5)
+        # open, then the safety close, then the later open: the close was sent.
+        assert resource_manager.opened["ASRL1::INSTR"].commands_received == 3
@@ -0,0 +1,71 @@
+import urllib.request
+
+from lumed_hl2000 import HL2000
+from lumed_hl2000.instrumentation import CommandEvent, Instrumentation
+from lumed_hl2000.metrics import MetricsExporter
+
+from .conftest import RESOURCE_NAME
+
+
+def _event(command, latency, reply="OK", error=None):
+    return CommandEvent(
+        resource_name=RESOURCE_NAME,
+        command=command,
+        bytes_sent=3,
+        bytes_received=0 if reply is None else len(reply) + 1,
+        reply=reply,
+        latency=latency,
+        retries=0 if error is None else 2,
+        error=error,
+        timestamp=100.0,
+    )
+
+
+def _samples(text):
+    return dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+
+
+def test_histogram_buckets_are_cumulative():
+    exporter = MetricsExporter(buckets=(0.01, 0.1))
+    for latency in (0.005, 0.01, 0.05, 0.5):
+        exporter.record(_event("S?", latency, "0"))
+    samples = _samples(exporter.render())
+    bucket = f'hl2000_command_latency_seconds_bucket{{resource="{RESOURCE_NAME}",le="%s"}}'
+    assert samples[bucket % "0.01"] == "2"
+    assert samples[bucket % "0.1"] == "3"
+    assert samples[bucket % "+Inf"] == "4"
+    assert samples[f'hl2000_command_latency_seconds_count{{resource="{RESOURCE_NAME}"}}'] == "4"
+    assert float(samples[f'hl2000_command_latency_seconds_sum{{resource="{RESOURCE_NAME}"}}']) == 0.565
+
+
+def test_render_counts_outcomes_cycles_and_retries():
+    exporter = MetricsExporter()
+    exporter.record(_event("S1", 0.01))
+    exporter.record(_event("S0", 0.01))
+    exporter.record(_event("S1", 0.01))
+    exporter.record(_event("L?", 0.2, None, TimeoutError()))
+    text = exporter.render()
+    samples = _samples(text)
+    resource = f'resource="{RESOURCE_NAME}"'
+    assert samples[f'hl2000_commands_total{{{resource},command="S1",outcome="ok"}}'] == "2"
+    assert samples[f'hl2000_commands_total{{{resource},command="L?",outcome="TimeoutError"}}'] == "1"
+    assert samples[f"hl2000_shutter_cycles_total{{{resource}}}"] == "2"
+    assert samples[f"hl2000_command_retries_total{{{resource}}}"] == "2"
+    assert samples[f'hl2000_serial_bytes_total{{{resource},direction="sent"}}'] == "12"
+    assert "# TYPE hl2000_command_latency_seconds histogram" in text
+
+
+def test_served_metrics_follow_the_driver(manager):
+    instrumentation = Instrumentation()
+    exporter = MetricsExporter().attach(instrumentation)
+    try:
+        host, port = exporter.serve(0)
+        with HL2000(manager.open_resource(RESOURCE_NAME), instrumentation=instrumentation) as lamp:
+            lamp.lamp_on()
+            lamp.open_shutter()
+        with urllib.request.urlopen(f"http://{host}:{port}/metrics", timeout=5) as response:
+            samples = _samples(response.read().decode())
+        assert samples[f'hl2000_shutter_cycles_total{{resource="{RESOURCE_NAME}"}}'] == "1"
+        assert float(samples[f'hl2000_lamp_on_seconds_total{{resource="{RESOURCE_NAME}"}}']) >= 0
+    finally:
+        exporter.close()
@@ -0,0 +1,55 @@
+from lumed_hl2000 import HL2000, HL2000Error
+from lumed_hl2000.instrumentation import Instrumentation
+from lumed_hl2000.journal import Journal
+from lumed_hl2000.replay import load, replay
+from lumed_hl2000.sim import SimulatedResourceManager
+
+IDENTITY = "HL-2000-HP-232R 1.04"
+
+
+def test_autodetect_session_replays_cleanly(tmp_path):
+    path = tmp_path / "session.hl2j"
+    manager = SimulatedResourceManager(("ASRL1::INSTR", "ASRL2::INSTR"), realtime=False)
+    instrumentation = Instrumentation()
+    journal = Journal(str(path)).attach(instrumentation)
+    probe = HL2000(manager.open_resource("ASRL2::INSTR"), instrumentation=instrumentation)
+    probe.report_command("V?", None, 0.1, 0, HL2000Error("no reply"))
+    probe.close()
+    resource = manager.open_resource("ASRL1::INSTR", identity=IDENTITY)
+    lamp = HL2000(resource, instrumentation=instrumentation)
+    try:
+        assert lamp.identify() == IDENTITY
+        lamp.open_shutter()
+        lamp.is_shutter_open()
+    finally:
+        lamp.close()
+        journal.close()
+
+    commands = load(str(path))
+    assert [(c.resource_name, c.command) for c in commands] == [
+        ("ASRL1::INSTR", "V?"),
+        ("ASRL1::INSTR", "S1"),
+        ("ASRL1::INSTR", "S?"),
+    ]
+    result = replay(commands, speed=None, realtime=False)
+    assert result.mismatches == ()
+
+
+def test_unanswered_commands_are_not_mismatches(tmp_path):
+    path = tmp_path / "session.hl2j"
+    manager = SimulatedResourceManager(("ASRL1::INSTR",), realtime=False)
+    instrumentation = Instrumentation()
+    journal = Journal(str(path)).attach(instrumentation)
+    lamp = HL2000(manager.open_resource("ASRL1::INSTR"), instrumentation=instrumentation)
+    try:
+        lamp.open_shutter()
+        lamp.report_command("S?", None, 0.1, 2, HL2000Error("timeout"))
+        lamp.close_shutter()
+    finally:
+        lamp.close()
+        journal.close()
+
+    result = replay(load(str(path)), speed=None, realtime=False)
+    assert result.mismatches == ()
+    assert result.unanswered == 1
+    assert len(result.latencies) == 3
@@ -0,0 +1,54 @@
+import threading
+import time
+
+from lumed_hl2000 import state as state_module
+from lumed_hl2000.state import DeviceState, StatePoller
+
+from .conftest import RESOURCE_NAME
+
+
+def test_subscribers_end_on_the_cached_state(worker, monkeypatch):
+    poller = StatePoller(worker)
+    seen = []
+    poller.subscribe(seen.append)
+    paused, resume = threading.Event(), threading.Event()
+    changed = state_module._changed
+
+    def slow_changed(previous, state):
+        # Hold the link thread between updating the cache and publishing.
+        if state.degraded and threading.current_thread() is not threading.main_thread():
+            paused.set()
+            resume.wait(5)
+        return changed(previous, state)
+
+    monkeypatch.setattr(state_module, "_changed", slow_changed)
+    link = threading.Thread(target=poller._on_link_change, args=(True,))
+    link.start()
+    assert paused.wait(5)
+    poller._update(lambda previous: DeviceState(shutter_open=True, lamp_on=False, timestamp=1.0))
+    resume.set()
+    link.join(5)
+    assert seen[-1] == poller.state
+
+
+def test_cache_goes_stale_without_successful_polls(worker, manager):
+    poller = StatePoller(worker, interval=0.02)
+    assert poller.max_age == 0.06
+    assert poller.stale and poller.state.age == float("inf")
+    state = poller.poll()
+    assert (state.shutter_open, state.lamp_on, state.last_error) == (False, False, None)
+    assert not poller.stale
+    sim = manager.opened[RESOURCE_NAME]
+    commands = sim.commands_received
+    # Reading the cache never touches the lamp.
+    for _ in range(100):
+        assert poller.state == state
+    assert sim.commands_received == commands
+
+    sim.inject_error()
+    failed = poller.poll()
+    assert failed.last_error and failed.timestamp == state.timestamp
+    time.sleep(0.07)
+    assert poller.stale
+    assert not poller.poll().last_error
+    assert not poller.stale
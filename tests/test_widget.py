@@ -0,0 +1,64 @@
+import os
+import time
+
+import pytest
+
+from lumed_hl2000 import StatePoller
+from lumed_hl2000.state import DeviceState
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+QtWidgets = pytest.importorskip("PyQt5.QtWidgets")
+
+
+@pytest.fixture(scope="module")
+def app():
+    return QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+
+
+def _process_until(app, condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition() and time.monotonic() < deadline:
+        app.processEvents()
+        time.sleep(0.005)
+    return condition()
+
+
+def test_widget_shows_polled_state_and_sends_commands(app, worker, manager):
+    from lumed_hl2000.widget import HL2000Widget
+
+    poller = StatePoller(worker, interval=0.01).start()
+    widget = HL2000Widget(worker, poller=poller, max_fps=100)
+    try:
+        assert _process_until(app, lambda: widget.status_label.text().startswith("Shutter closed"))
+        widget.shutter_button.setChecked(True)
+        assert _process_until(app, lambda: widget.status_label.text().startswith("Shutter open"))
+        assert manager.opened["ASRL1::INSTR"].shutter_open
+    finally:
+        widget.close()
+        poller.stop(timeout=5)
+
+
+def test_repaints_are_throttled_and_draw_the_newest_state(app, worker):
+    from lumed_hl2000.widget import HL2000Widget
+
+    widget = HL2000Widget(worker, poller=StatePoller(worker), max_fps=20)
+    drawn = []
+    redraw = widget._redraw
+    widget._redraw = lambda state: (drawn.append(state), redraw(state))
+    try:
+        _process_until(app, lambda: drawn)
+        drawn.clear()
+        start = time.monotonic()
+        for i in range(1, 301):
+            widget._bridge.post_state(DeviceState(shutter_open=i % 2 == 0, lamp_on=True, timestamp=float(i)))
+            app.processEvents()
+            time.sleep(0.001)
+        last = DeviceState(shutter_open=True, lamp_on=False, timestamp=1000.0)
+        widget._bridge.post_state(last)
+        assert _process_until(app, lambda: drawn and drawn[-1] == last)
+        elapsed = time.monotonic() - start
+        # 20 fps over the run, plus the frame in progress at each end.
+        assert len(drawn) <= elapsed * 20 + 2
+        assert widget.status_label.text() == "Shutter open, lamp off"
+    finally:
+        widget.close()
@@ -0,0 +1,186 @@
+import threading
+
+import pytest
+
+from lumed_hl2000 import HL2000, HL2000ClosedError, HL2000CommandError, IOWorker, instrumentation
+from lumed_hl2000.sim import SimulatedResourceManager
+
+from .conftest import RESOURCE_NAME
+
+
+def _block(worker):
+    """Hold the worker thread until the returned event is set."""
+    gate = threading.Event()
+    started = threading.Event()
+
+    def hold(driver):
+        started.set()
+        gate.wait(5)
+
+    worker.call(hold)
+    assert started.wait(5)
+    return gate
+
+
+def test_results_come_back_through_futures(worker):
+    assert worker.submit("is_lamp_on").result(5) is False
+    worker.submit("lamp_on").result(5)
+    assert worker.submit("is_lamp_on").result(5) is True
+
+
+def test_queued_writes_to_one_setting_are_coalesced(worker, manager):
+    gate = _block(worker)
+    futures = [worker.submit("set_shutter", i % 2 == 0) for i in range(100)]
+    gate.set()
+    for future in futures:
+        assert future.result(5) is None
+    assert worker.coalesced == 99
+    assert manager.opened[RESOURCE_NAME].commands_received == 1
+    assert manager.opened[RESOURCE_NAME].shutter_open is False
+
+
+def test_many_superseded_writes_do_not_recurse(worker):
+    gate = _block(worker)
+    futures = [worker.submit("set_shutter", i % 2 == 0) for i in range(5000)]
+    gate.set()
+    futures[0].result(5)
+
+
+def test_urgent_requests_run_first(worker):
+    gate = _block(worker)
+    order = []
+    worker.call(lambda driver: order.append("normal"))
+    worker.call(lambda driver: order.append("urgent"), urgent=True)
+    done = worker.call(lambda driver: order.append("last"))
+    gate.set()
+    done.result(5)
+    assert order == ["urgent", "normal", "last"]
+
+
+def test_stop_fails_queued_requests(manager):
+    worker = IOWorker(lambda: HL2000.open(RESOURCE_NAME, manager)).start()
+    worker.stop(timeout=5)
+    with pytest.raises(HL2000ClosedError):
+        worker.submit("is_lamp_on").result(5)
+
+
+def test_reconnect_replays_commanded_state(worker, manager):
+    pytest.importorskip("pyvisa")
+    changes = []
+    worker.add_link_listener(changes.append)
+    worker.submit("lamp_on").result(5)
+    manager.unplug(RESOURCE_NAME)
+    future = worker.submit("is_lamp_on")
+    threading.Timer(0.05, manager.replug, (RESOURCE_NAME,)).start()
+    assert future.result(5) is True
+    assert changes == [True, False]
+    assert worker.reconnects == 1
+    assert not worker.degraded
+
+
+def test_open_failure_is_reported_to_every_request():
+    manager = SimulatedResourceManager(("ASRL1::INSTR",), realtime=False)
+    worker = IOWorker(lambda: HL2000.open("ASRL9::INSTR", manager)).start()
+    try:
+        with pytest.raises(Exception):
+            worker.submit("is_lamp_on").result(5)
+    finally:
+        worker.stop(timeout=5)
+
+
+def test_normal_write_never_replaces_an_urgent_one(worker, manager):
+    gate = _block(worker)
+    close = worker.submit("close_shutter", urgent=True)
+    reopen = worker.submit("open_shutter")
+    gate.set()
+    close.result(5)
+    reopen.result(5)
+    assert worker.coalesced == 0
+    assert manager.opened[RESOURCE_NAME].commands_received == 2
+
+
+def test_urgent_write_replaces_a_queued_normal_one(worker, manager):
+    gate = _block(worker)
+    opened = worker.submit("open_shutter")
+    closed = worker.submit("close_shutter", urgent=True)
+    gate.set()
+    closed.result(5)
+    opened.result(5)
+    assert worker.coalesced == 1
+    assert manager.opened[RESOURCE_NAME].shutter_open is False
+
+
+def test_reconnect_during_a_write_does_not_replay_the_old_setting(worker, manager):
+    pytest.importorskip("pyvisa")
+    sent = []
+    detach = instrumentation.default.add_listener(lambda event: event.error is None and sent.append(event.command))
+    try:
+        worker.submit("open_shutter").result(5)
+        manager.unplug(RESOURCE_NAME)
+        future = worker.submit("close_shutter")
+        threading.Timer(0.05, manager.replug, (RESOURCE_NAME,)).start()
+        future.result(5)
+    finally:
+        detach()
+    assert sent == ["S1", "S0", "S0"]
+    assert manager.opened[RESOURCE_NAME].shutter_open is False
+
+
+def test_rejected_writes_do_not_wedge_the_reconnect(manager):
+    pytest.importorskip("pyvisa")
+    rejected = {"L1"}
+
+    def opener():
+        driver = HL2000.open(RESOURCE_NAME, manager, timeout_ms=100)
+        execute = driver.resource._execute
+        driver.resource._execute = lambda command: "E05" if command in rejected else execute(command)
+        return driver
+
+    worker = IOWorker(opener, reconnect_delay=0.01).start()
+    try:
+        with pytest.raises(HL2000CommandError):
+            worker.submit("lamp_on").result(5)
+        worker.submit("open_shutter").result(5)
+        rejected.add("S1")
+        manager.unplug(RESOURCE_NAME)
+        future = worker.submit("is_lamp_on")
+        threading.Timer(0.05, manager.replug, (RESOURCE_NAME,)).start()
+        assert future.result(5) is False
+        assert not worker.degraded
+        worker.submit("close_shutter").result(5)
+    finally:
+        worker.stop(timeout=5)
+
+
+def test_reconnect_leaves_queued_settings_to_their_write(worker, manager):
+    pytest.importorskip("pyvisa")
+    sent = []
+    lost = threading.Event()
+    worker.add_link_listener(lambda degraded: degraded and lost.set())
+    detach = instrumentation.default.add_listener(lambda event: event.error is None and sent.append(event.command))
+    try:
+        worker.submit("open_shutter").result(5)
+        manager.unplug(RESOURCE_NAME)
+        query = worker.submit("is_lamp_on")
+        assert lost.wait(5)
+        close = worker.submit("close_shutter", urgent=True)
+        manager.replug(RESOURCE_NAME)
+        query.result(5)
+        close.result(5)
+    finally:
+        detach()
+    assert sent == ["S1", "L?", "S0"]
+    assert manager.opened[RESOURCE_NAME].shutter_open is False
+
+
+def test_a_query_between_writes_sees_the_first_one(worker, manager):
+    gate = _block(worker)
+    opened = worker.submit("open_shutter")
+    query = worker.submit("is_shutter_open")
+    closed = worker.submit("close_shutter")
+    gate.set()
+    assert query.result(5) is True
+    opened.result(5)
+    closed.result(5)
+    assert worker.coalesced == 0
+    assert manager.opened[RESOURCE_NAME].shutter_open is False